@@ -0,0 +1 @@
+"""Shared image-processing code for the assets in client/public/images."""
@@ -0,0 +1,185 @@
+"""Sprite atlases: packs small images into a few size-limited sheets.
+
+Each sprite is optionally scaled down to `sprite_size`, then placed with
+the MaxRects best-short-side-fit heuristic; a sprite that doesn't fit in
+any open sheet starts a new one. Alongside the sheets a JSON map gives
+each sprite's sheet and rectangle, keyed by the image's path relative to
+the public directory so the client can look up the URL it already uses.
+"""
+import json
+import os
+
+from PIL import Image
+
+from . import pngopt
+
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_PADDING = 2
+
+
+class _MaxRectsBin:
+    """Free-space tracking for one sheet, as a list of maximal free rectangles."""
+
+    def __init__(self, width, height):
+        self.free = [(0, 0, width, height)]
+
+    def find(self, width, height):
+        """Returns the (x, y) leaving the smallest leftover side, or None if nothing fits."""
+        best, best_key = None, None
+        for x, y, w, h in self.free:
+            if width <= w and height <= h:
+                key = (min(w - width, h - height), max(w - width, h - height))
+                if best_key is None or key < best_key:
+                    best, best_key = (x, y), key
+        return best
+
+    def place(self, x, y, width, height):
+        right, bottom = x + width, y + height
+        free = []
+        for fx, fy, fw, fh in self.free:
+            if x >= fx + fw or right <= fx or y >= fy + fh or bottom <= fy:
+                free.append((fx, fy, fw, fh))
+                continue
+            # Split the overlapped free rectangle into the parts left of,
+            # right of, above and below the placed one.
+            if x > fx:
+                free.append((fx, fy, x - fx, fh))
+            if right < fx + fw:
+                free.append((right, fy, fx + fw - right, fh))
+            if y > fy:
+                free.append((fx, fy, fw, y - fy))
+            if bottom < fy + fh:
+                free.append((fx, bottom, fw, fy + fh - bottom))
+        self.free = [r for i, r in enumerate(free) if not any(
+            i != j and _contains(other, r) and (other != r or j < i) for j, other in enumerate(free))]
+
+
+def _contains(outer, inner):
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and inner[0] + inner[2] <= outer[0] + outer[2] and inner[1] + inner[3] <= outer[1] + outer[3])
+
+
+def pack(sizes, max_size=DEFAULT_MAX_SIZE, padding=DEFAULT_PADDING):
+    """Packs (width, height) rectangles into sheets of at most `max_size` square.
+
+    Returns a (sheet, x, y) placement for each size, in the input order.
+    """
+    # `padding` is added to the right and bottom of every sprite; the sheet
+    # gets the same allowance so sprites can still reach its far edges.
+    order = sorted(range(len(sizes)), key=lambda i: (max(sizes[i]), sizes[i][0] * sizes[i][1]), reverse=True)
+    bins = []
+    placements = [None] * len(sizes)
+    for i in order:
+        width, height = sizes[i][0] + padding, sizes[i][1] + padding
+        if width > max_size + padding or height > max_size + padding:
+            raise ValueError(f"A {sizes[i][0]}x{sizes[i][1]} sprite does not fit in a {max_size}px sheet")
+        for sheet, packer in enumerate(bins):
+            spot = packer.find(width, height)
+            if spot:
+                break
+        else:
+            bins.append(_MaxRectsBin(max_size + padding, max_size + padding))
+            sheet, packer = len(bins) - 1, bins[-1]
+            spot = packer.find(width, height)
+        packer.place(*spot, width, height)
+        placements[i] = (sheet, *spot)
+    return placements
+
+
+def resolve_settings(settings, root, png_optimize=None):
+    """Resolves an entry of the manifest's "atlases" list against `root`."""
+    resolved = dict(settings)
+    resolved["settings"] = settings
+    resolved["root"] = root
+    resolved["output"] = os.path.normpath(os.path.join(root, settings["output"]))
+    resolved["images"] = [os.path.normpath(os.path.join(root, p)) for p in settings["images"]]
+    resolved["png_optimize"] = pngopt.resolve_settings(settings.get("png_optimize", png_optimize))
+    return resolved
+
+
+def map_path(atlas):
+    return atlas["output"] + ".json"
+
+
+def sheet_path(atlas, index):
+    return f"{atlas['output']}-{index}.png"
+
+
+def built_sheets(atlas):
+    """The paths of the sheets the atlas's current map lists, or [] if it hasn't been built."""
+    if not os.path.exists(map_path(atlas)):
+        return []
+    with open(map_path(atlas), encoding="utf-8") as f:
+        return [sheet_path(atlas, i) for i in range(len(json.load(f)["sheets"]))]
+
+
+def is_stale(atlas):
+    """True when the map is missing, was built with other settings, or is older than an image."""
+    path = map_path(atlas)
+    if not os.path.exists(path):
+        return True
+    with open(path, encoding="utf-8") as f:
+        previous = json.load(f)
+    if previous.get("settings") != atlas["settings"]:
+        return True
+    if not all(os.path.exists(sheet_path(atlas, i)) for i in range(len(previous["sheets"]))):
+        return True
+    built = os.path.getmtime(path)
+    return any(not os.path.exists(p) or os.path.getmtime(p) > built for p in atlas["images"])
+
+
+def build(atlas):
+    """Packs the atlas's images, writes its sheets and map; returns the map."""
+    sprites = []
+    for path in atlas["images"]:
+        with Image.open(path) as img:
+            source_size = img.size
+            sprite = img.convert("RGBA")
+        if atlas.get("sprite_size"):
+            sprite.thumbnail((atlas["sprite_size"], atlas["sprite_size"]), Image.Resampling.LANCZOS)
+        sprites.append((path, source_size, sprite))
+
+    placements = pack([s.size for _, _, s in sprites], atlas.get("max_size", DEFAULT_MAX_SIZE),
+                      atlas.get("padding", DEFAULT_PADDING))
+    sheet_count = max(sheet for sheet, _, _ in placements) + 1
+    extents = [[0, 0] for _ in range(sheet_count)]
+    for (_, _, sprite), (sheet, x, y) in zip(sprites, placements):
+        extents[sheet][0] = max(extents[sheet][0], x + sprite.width)
+        extents[sheet][1] = max(extents[sheet][1], y + sprite.height)
+
+    def rel(p):
+        return os.path.relpath(p, atlas["root"]).replace(os.sep, "/")
+
+    sheets = [Image.new("RGBA", tuple(extent), (0, 0, 0, 0)) for extent in extents]
+    entries = {}
+    for (path, source_size, sprite), (sheet, x, y) in zip(sprites, placements):
+        sheets[sheet].paste(sprite, (x, y))
+        entries[rel(path)] = {
+            "sheet": sheet,
+            "x": x,
+            "y": y,
+            "width": sprite.width,
+            "height": sprite.height,
+            "source_width": source_size[0],
+            "source_height": source_size[1],
+        }
+
+    os.makedirs(os.path.dirname(atlas["output"]), exist_ok=True)
+    for index, img in enumerate(sheets):
+        path = sheet_path(atlas, index)
+        img.save(path, "PNG")
+        if atlas["png_optimize"]:
+            pngopt.optimize_file(path, atlas["png_optimize"])
+
+    atlas_map = {
+        "settings": atlas["settings"],
+        "sheets": [{"path": rel(sheet_path(atlas, i)), "width": img.width, "height": img.height}
+                   for i, img in enumerate(sheets)],
+        "sprites": entries,
+    }
+    tmp_path = map_path(atlas) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(atlas_map, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, map_path(atlas))
+    return atlas_map
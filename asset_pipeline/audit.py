@@ -0,0 +1,234 @@
+"""Audits the images the site ships: unused files, duplicates, byte budgets and savings.
+
+Every image under the images directory is checked for:
+
+- references: whether its file name appears anywhere in the client
+  sources. Names built at run time can't be found this way; such assets
+  are listed in "keep" (glob patterns relative to the root). Files the
+  pipeline derives from others (the variants in the asset manifest and
+  atlas sheets) are judged by their sources instead, so a variant of an
+  unused output is unused too. Job outputs are judged like any file: a
+  stale generation nothing loads is what this check is for.
+- duplicates: byte-identical files, and near duplicates whose perceptual
+  hashes (the ones the golden-image checks use) are within
+  "max_hash_distance" bits.
+- budgets: "max_file_bytes" per file, overridden by the glob patterns of
+  "file_budgets", and "max_total_bytes" for the whole directory.
+
+The savings ranking puts these together, per file: dropping an unused
+file or a duplicate copy, bringing a file within budget and, when asked,
+re-encoding it with the pipeline's PNG optimiser or JPEG encoder.
+"""
+import fnmatch
+import json
+import os
+
+from PIL import Image
+
+from . import atlas, golden, jpegenc, pngopt
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".avif", ".gif", ".svg")
+SOURCE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".css", ".html", ".json", ".md")
+DEFAULT_MAX_HASH_DISTANCE = 4
+
+
+def resolve_settings(settings, root, png_optimize=None, jpeg=None):
+    """Fills in defaults for a manifest "audit" block; paths are resolved against `root`.
+
+    The manifest's "png_optimize" and "jpeg" blocks are kept for the
+    re-encoding estimates.
+    """
+    settings = dict(settings) if isinstance(settings, dict) else {}
+    settings["images"] = os.path.normpath(os.path.join(root, settings.get("images", "images")))
+    settings["sources"] = [os.path.normpath(os.path.join(root, p))
+                           for p in settings.get("sources", ["../src", "../index.html"])]
+    settings["keep"] = list(settings.get("keep", []))
+    settings["max_file_bytes"] = settings.get("max_file_bytes")
+    settings["max_total_bytes"] = settings.get("max_total_bytes")
+    settings["file_budgets"] = dict(settings.get("file_budgets", {}))
+    settings["max_hash_distance"] = settings.get("max_hash_distance", DEFAULT_MAX_HASH_DISTANCE)
+    settings["png_optimize"] = pngopt.resolve_settings(png_optimize or True)
+    settings["jpeg"] = jpegenc.resolve_settings(jpeg)
+    return settings
+
+
+def _walk(paths, extensions):
+    for path in paths:
+        if os.path.isfile(path):
+            if path.lower().endswith(extensions):
+                yield path
+            continue
+        for directory, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d not in ("node_modules", "dist") and not d.startswith("."))
+            for name in sorted(files):
+                if name.lower().endswith(extensions):
+                    yield os.path.join(directory, name)
+
+
+def read_sources(paths):
+    """The text of every source file under `paths`, concatenated."""
+    texts = []
+    for path in _walk(paths, SOURCE_EXTENSIONS):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            texts.append(f.read())
+    return "\n".join(texts)
+
+
+def derived_paths(manifest):
+    """Maps the files a loaded job manifest derives from others to their sources.
+
+    That is the variants in the asset manifest, derived from the output
+    they are listed under, and the current atlas sheets, derived from the
+    atlas's images.
+    """
+    derived = {}
+    for settings in manifest["atlases"]:
+        for sheet in atlas.built_sheets(settings):
+            derived[sheet] = list(settings["images"])
+    if manifest["asset_manifest"] and os.path.exists(manifest["asset_manifest"]):
+        with open(manifest["asset_manifest"], encoding="utf-8") as f:
+            entries = json.load(f)
+        for key, entry in entries.items():
+            for variant in entry.get("variants", []):
+                derived[os.path.join(manifest["root"], variant["path"])] = [os.path.join(manifest["root"], key)]
+    return {os.path.normpath(path): [os.path.normpath(s) for s in sources] for path, sources in derived.items()}
+
+
+def scan(settings, root, pipeline_inputs=(), derived=None):
+    """One record per image: {"path", "bytes", "sha256", "phash", "referenced", "derived_from", "pipeline_input"}.
+
+    A file in `derived` (see derived_paths) is referenced when any of its
+    sources is; "derived_from" lists those sources relative to the root.
+    "phash" is None for images Pillow can't decode, such as SVGs.
+    """
+    sources = read_sources(settings["sources"])
+    pipeline_inputs = set(pipeline_inputs)
+    derived = derived or {}
+
+    def rel(path):
+        return os.path.relpath(path, root).replace(os.sep, "/")
+
+    def referenced(path):
+        return (os.path.basename(path) in sources
+                or any(fnmatch.fnmatch(rel(path), pattern) for pattern in settings["keep"]))
+
+    records = []
+    for path in _walk([settings["images"]], IMAGE_EXTENSIONS):
+        try:
+            phash = golden.perceptual_hash(path)
+        except (OSError, ValueError):
+            phash = None
+        parents = derived.get(path)
+        records.append({
+            "path": rel(path),
+            "bytes": os.path.getsize(path),
+            "sha256": golden.file_sha256(path),
+            "phash": phash,
+            "referenced": any(referenced(p) for p in parents) if parents else referenced(path),
+            "derived_from": [rel(p) for p in parents or []],
+            "pipeline_input": path in pipeline_inputs,
+        })
+    return records
+
+
+def duplicates(records, max_hash_distance):
+    """Returns (exact, near): lists of byte-identical groups, and (a, b, distance) near-duplicate pairs.
+
+    Near pairs where one file is derived from the other, or both from the
+    same source, such as an output and its variants, are the pipeline's
+    doing and left out.
+    """
+    by_digest = {}
+    for record in records:
+        by_digest.setdefault(record["sha256"], []).append(record)
+    exact = [group for group in by_digest.values() if len(group) > 1]
+    near = []
+    hashed = [r for r in records if r["phash"]]
+    for i, a in enumerate(hashed):
+        for b in hashed[i + 1:]:
+            if a["sha256"] == b["sha256"] or _related(a, b):
+                continue
+            distance = golden.hash_distance(a["phash"], b["phash"])
+            if distance <= max_hash_distance:
+                near.append((a, b, distance))
+    return exact, sorted(near, key=lambda pair: pair[2])
+
+
+def _related(a, b):
+    return (a["path"] in b["derived_from"] or b["path"] in a["derived_from"]
+            or bool(set(a["derived_from"]) & set(b["derived_from"])))
+
+
+def file_budget(settings, path):
+    """The byte budget for the file at `path` (relative to the root), or None."""
+    for pattern, budget in settings["file_budgets"].items():
+        if fnmatch.fnmatch(path, pattern):
+            return budget
+    return settings["max_file_bytes"]
+
+
+def budget_violations(records, settings):
+    """Returns (files over their budget as (record, budget), total bytes, whether the total is over)."""
+    over = []
+    for record in records:
+        budget = file_budget(settings, record["path"])
+        if budget is not None and record["bytes"] > budget:
+            over.append((record, budget))
+    total = sum(r["bytes"] for r in records)
+    return over, total, settings["max_total_bytes"] is not None and total > settings["max_total_bytes"]
+
+
+def reencoded_size(path, settings):
+    """The size the pipeline's own encoder would give the image at `path`, or None for other formats."""
+    extension = os.path.splitext(path)[1].lower()
+    with Image.open(path) as img:
+        if extension == ".png":
+            return len(pngopt.optimize(img, settings["png_optimize"])[0])
+        if extension in (".jpg", ".jpeg"):
+            return len(jpegenc.encode(img, settings["jpeg"])[0])
+    return None
+
+
+def savings(records, settings, root, estimate=False):
+    """Ranks the files by the most that could be saved on each, largest first.
+
+    Returns [{"path", "bytes", "saving", "reasons"}] for the files with
+    anything to save. With `estimate`, every referenced PNG and JPEG is
+    re-encoded in memory to see what the pipeline's encoders would save.
+    """
+    exact, near = duplicates(records, settings["max_hash_distance"])
+    options = {r["path"]: [] for r in records}
+
+    def offer(record, saving, reason):
+        if saving > 0:
+            options[record["path"]].append((saving, reason))
+
+    for record in records:
+        if not record["referenced"]:
+            offer(record, record["bytes"], "unreferenced" + (" (a pipeline input)" if record["pipeline_input"] else ""))
+    for group in exact:
+        keep = min(group, key=lambda r: (not r["referenced"], r["path"]))
+        for record in group:
+            if record is not keep:
+                offer(record, record["bytes"], f"duplicate of {keep['path']}")
+    for a, b, distance in near:
+        # Only one of a referenced / unreferenced pair is a clear candidate.
+        if a["referenced"] != b["referenced"]:
+            drop, keep = (b, a) if a["referenced"] else (a, b)
+            offer(drop, drop["bytes"], f"near duplicate of {keep['path']} (distance {distance})")
+    for record, budget in budget_violations(records, settings)[0]:
+        offer(record, record["bytes"] - budget, f"{(record['bytes'] - budget) / 1024:.0f} KB over its budget")
+    if estimate:
+        for record in records:
+            if record["referenced"]:
+                size = reencoded_size(os.path.join(root, record["path"]), settings)
+                if size is not None:
+                    offer(record, record["bytes"] - size, f"re-encodes to {size / 1024:.0f} KB")
+
+    ranked = []
+    for record in records:
+        if options[record["path"]]:
+            best = max(option[0] for option in options[record["path"]])
+            ranked.append({"path": record["path"], "bytes": record["bytes"], "saving": best,
+                           "reasons": [reason for _, reason in sorted(options[record["path"]], reverse=True)]})
+    return sorted(ranked, key=lambda r: r["saving"], reverse=True)
@@ -0,0 +1,199 @@
+"""White-background removal on uint8 RGBA pixel buffers."""
+import numpy as np
+from PIL import Image, ImageFilter
+
+from . import parallel
+
+DEFAULT_THRESHOLD = 240
+
+# Jobs may set "threshold": "auto" to have it picked per image by auto_threshold().
+AUTO_THRESHOLD = "auto"
+AUTO_SAMPLE_SIZE = 512
+AUTO_THRESHOLD_RANGE = (160, 254)
+# How far above the typical count below the white peak its tail may still be.
+AUTO_KNEE = 3
+
+
+def tolerance_to_threshold(tolerance):
+    """Maps the older `tolerance` argument (distance from pure white) to a threshold."""
+    return 255 - tolerance
+
+
+def auto_threshold(img, sample_size=AUTO_SAMPLE_SIZE):
+    """Picks a background threshold for `img` from one histogram of a low-resolution copy.
+
+    The copy is nearest-neighbour sampled so it keeps the full-resolution
+    noise of the background. Pixels are histogrammed by their darkest
+    channel. Going down from the near-white peak, the threshold is the
+    first (smoothed) bin where the peak's tail has fallen to AUTO_KNEE
+    times the typical count below it: the top of an empty valley when the
+    subject is well separated, and the knee where the tail meets the
+    subject's own light tones when it is not, so those are kept. Falls
+    back to DEFAULT_THRESHOLD when there is no white background to find
+    or the tail never flattens out above the bottom of AUTO_THRESHOLD_RANGE.
+    """
+    # Sampling picks pixels without mixing them, so only the sample needs converting.
+    sample = img.resize(auto_sample_size(img.size, sample_size), Image.Resampling.NEAREST)
+    return threshold_from_sample(np.asarray(sample.convert(sample_mode(sample.mode))))
+
+
+def auto_sample_size(size, sample_size=AUTO_SAMPLE_SIZE):
+    """The size of the copy auto_threshold samples from an image of `size`."""
+    factor = max(1, max(size) // sample_size)
+    return max(1, size[0] // factor), max(1, size[1] // factor)
+
+
+def sample_mode(mode):
+    """The mode auto_threshold histograms an image of `mode` in."""
+    return mode if mode in ("RGB", "RGBA") else "RGBA"
+
+
+def threshold_from_sample(sample):
+    """auto_threshold's pick for an (h, w, 3 or 4) uint8 array of sampled pixels."""
+    darkest = sample[..., :3].min(axis=-1)
+    if sample.shape[-1] == 4:
+        darkest = darkest[sample[..., 3] > 0]
+    hist = np.bincount(darkest.ravel(), minlength=256)
+
+    low, high = AUTO_THRESHOLD_RANGE
+    peak = low + int(np.argmax(hist[low:]))
+    if peak == low or hist[peak] < 0.01 * darkest.size:
+        return DEFAULT_THRESHOLD
+    smoothed = np.convolve(hist, np.ones(5) / 5, mode="same")
+    floor = np.median(smoothed[low:peak])
+    flat = np.flatnonzero(smoothed[low:peak] <= AUTO_KNEE * floor)
+    if flat.size == 0 or flat[-1] == 0:
+        return DEFAULT_THRESHOLD
+    return int(min(low + flat[-1], high))
+
+
+def white_mask(pixels, threshold=DEFAULT_THRESHOLD):
+    """Boolean mask of the pixels whose R, G and B are all above `threshold`."""
+    mask = pixels[..., 0] > threshold
+    mask &= pixels[..., 1] > threshold
+    mask &= pixels[..., 2] > threshold
+    return mask
+
+
+def clear_white_pixels(pixels, threshold=DEFAULT_THRESHOLD):
+    """Makes every pixel whose R, G and B are all above `threshold` transparent.
+
+    `pixels` is an (height, width, 4) uint8 array and is modified in place.
+    Matching pixels are rewritten to (255, 255, 255, 0), like the old
+    per-pixel loops did. Returns the boolean mask of cleared pixels.
+    """
+    mask = white_mask(pixels, threshold)
+    pixels[mask] = (255, 255, 255, 0)
+    return mask
+
+
+def remove_white_background(img, threshold=DEFAULT_THRESHOLD, threads=parallel.DEFAULT_THREADS):
+    """Returns an RGBA copy of `img` with its near-white pixels made transparent.
+
+    With `threads`, the conversion and thresholding run on bands of rows.
+    """
+    pixels = np.array(parallel.convert(img, "RGBA", threads))
+    parallel.map_bands(lambda y0, y1: clear_white_pixels(pixels[y0:y1], threshold), len(pixels), threads)
+    return Image.fromarray(pixels)
+
+
+def _runs(mask):
+    """Horizontal runs of True in a 2-D mask as (row, start, end) arrays, ordered by row then start."""
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), np.int8)
+    padded[:, 1:-1] = mask
+    # Each row is padded with False on both sides, so its edges alternate start, end.
+    edges = np.flatnonzero(np.diff(padded, axis=1))
+    rows, starts = np.divmod(edges[0::2], width + 1)
+    return rows, starts, edges[1::2] - rows * (width + 1)
+
+
+def _run_links(rows, starts, ends, width):
+    """Pairs of runs in adjacent rows that touch (4-connectivity), as two index arrays."""
+    stride = width + 1
+    start_keys = rows * stride + starts
+    end_keys = rows * stride + ends
+    # Runs in the next row that overlap [start, end): their end is past our
+    # start and their start is before our end. Keys sort by row, then column.
+    first = np.searchsorted(end_keys, (rows + 1) * stride + starts, side="right")
+    last = np.searchsorted(start_keys, (rows + 1) * stride + ends, side="left")
+    counts = np.maximum(last - first, 0)
+    upper = np.repeat(np.arange(len(rows)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return upper, np.repeat(first, counts) + offsets
+
+
+def _compress(labels):
+    """Points every entry of the union-find forest `labels` straight at its root."""
+    while True:
+        parents = labels[labels]
+        if np.array_equal(parents, labels):
+            return labels
+        labels = parents
+
+
+def _label_runs(count, a, b):
+    """Connected-component labels for `count` runs joined by the links (a, b).
+
+    A union-find over whole arrays: each round hooks the larger root of
+    every link whose ends are still apart onto the smallest root it is
+    linked to, compresses every path to its root, and drops the links now
+    inside one component. Every root with a smaller neighbour is merged
+    away each round, so the rounds don't grow with the length of the
+    paths through a component: six for 4K of random noise at the
+    percolation threshold, the worst case for propagating labels.
+    """
+    labels = np.arange(count)
+    while len(a):
+        root_a, root_b = labels[a], labels[b]
+        apart = root_a != root_b
+        if not apart.any():
+            break
+        a, b = a[apart], b[apart]
+        low = np.minimum(root_a[apart], root_b[apart])
+        high = np.maximum(root_a[apart], root_b[apart])
+        np.minimum.at(labels, high, low)
+        labels = _compress(labels)
+    return labels
+
+
+def border_background_mask(pixels, threshold=DEFAULT_THRESHOLD):
+    """Mask of the near-white pixels connected to the image border.
+
+    Unlike `white_mask`, white areas enclosed by the subject (paper, page
+    highlights) are left alone.
+    """
+    height, width = pixels.shape[:2]
+    rows, starts, ends = _runs(white_mask(pixels, threshold))
+    if not len(rows):
+        return np.zeros((height, width), bool)
+    labels = _label_runs(len(rows), *_run_links(rows, starts, ends, width))
+    on_border = (rows == 0) | (rows == height - 1) | (starts == 0) | (ends == width)
+    keep = np.isin(labels, labels[on_border])
+
+    # Paint the kept runs back: +1 at each start, -1 at each end, then a running sum.
+    steps = np.zeros((height, width + 1), np.int8)
+    steps[rows[keep], starts[keep]] = 1
+    steps[rows[keep], ends[keep]] = -1
+    return np.cumsum(steps[:, :width], axis=1, dtype=np.int8) > 0
+
+
+def feather_alpha(mask, radius):
+    """Alpha channel that is 0 on `mask` and ramps up to 255 over about `radius` pixels outside it."""
+    background = Image.fromarray(mask.astype(np.uint8) * 255)
+    ramp = 255 - np.asarray(background.filter(ImageFilter.GaussianBlur(radius)))
+    return np.where(mask, 0, ramp).astype(np.uint8)
+
+
+def remove_border_background(img, threshold=DEFAULT_THRESHOLD, feather=0):
+    """Returns an RGBA copy of `img` with the near-white regions touching its border made transparent.
+
+    With `feather`, the subject's alpha ramps up over that many pixels at
+    the boundary instead of switching from 0 to 255 in one step.
+    """
+    pixels = np.array(img.convert("RGBA"))
+    mask = border_background_mask(pixels, threshold)
+    if feather:
+        pixels[..., 3] = np.minimum(pixels[..., 3], feather_alpha(mask, feather))
+    pixels[mask] = (255, 255, 255, 0)
+    return Image.fromarray(pixels)
@@ -0,0 +1,159 @@
+"""Benchmarks the manifest operations on synthetic images.
+
+Each (operation, size) case runs in a fresh worker process so that its peak
+RSS is not inflated by earlier cases. Results are written as JSON and can be
+compared against an earlier run to catch regressions.
+"""
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import PIL
+from PIL import Image, ImageDraw
+
+from . import fontsubset, profiling
+from . import jobs as jobs_module
+
+SIZES = {
+    "small": (512, 512),
+    "medium": (2048, 1536),
+    "large": (4096, 3072),
+}
+
+# Operation -> (synthetic source kind, job parameters), mirroring pipeline.json.
+CASES = {
+    "remove-bg": ("icon", {"threshold": 225, "crop": False}),
+    "crop": ("rgba", {}),
+    "bake-title": ("background", {"text": "优秀成果展板", "font_size_ratio": 0.06, "relative_to": "height",
+                                  "y": 0.08, "anchor": "middle", "fill": [218, 165, 32],
+                                  "shadow_fill": [0, 0, 0], "shadow_offset": 3}),
+    "zoom-out": ("background", {"scale": 0.65, "quality": 95}),
+    "circular-mask": ("rgba", {}),
+}
+
+_EXTENSIONS = {"icon": ".png", "background": ".jpg", "rgba": ".png"}
+
+
+def _noise(rng, shape, amount):
+    return rng.integers(-amount, amount + 1, shape, dtype=np.int16)
+
+
+def make_source(kind, size, seed=0):
+    """Generates a deterministic synthetic source image of the given kind and size.
+
+    "icon" is a textured object on a white background, "background" a noisy
+    gradient like the bookshelf photos, and "rgba" an object that already has
+    a transparent surround.
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    if kind == "background":
+        y, x = np.mgrid[0:height, 0:width]
+        base = np.stack([90 + 80 * x / width, 60 + 60 * y / height, 40 + 40 * (x + y) / (width + height)], axis=-1)
+        pixels = np.clip(base + _noise(rng, base.shape, 12), 0, 255).astype(np.uint8)
+        return Image.fromarray(pixels, "RGB")
+
+    img = Image.new("RGBA" if kind == "rgba" else "RGB", size, (0, 0, 0, 0) if kind == "rgba" else (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    margin_x, margin_y = width // 6, height // 6
+    draw.ellipse((margin_x, margin_y, width - margin_x, height - margin_y), fill=(150, 90, 40, 255))
+    draw.rectangle((width // 3, height // 4, 2 * width // 3, 3 * height // 4), fill=(70, 40, 20, 255))
+    pixels = np.asarray(img).astype(np.int16)
+    inside = pixels[..., :3].sum(axis=-1) < 3 * 240 if kind == "icon" else pixels[..., 3] > 0
+    pixels[..., :3][inside] += _noise(rng, (int(inside.sum()), 3), 20)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), img.mode)
+
+
+def _run_case(job, repeat):
+    """Runs one job `repeat` times in this (fresh) process; returns timings and peak RSS."""
+    baseline = profiling.peak_rss_mb()
+    seconds = []
+    for _ in range(repeat):
+        result = jobs_module.run_job(job)
+        if not result["ok"]:
+            raise RuntimeError(f"{job['op']} failed: {result['error']}")
+        seconds.append(result["seconds"])
+    return {"seconds": seconds, "baseline_rss_mb": baseline, "peak_rss_mb": profiling.peak_rss_mb()}
+
+
+def run_benchmarks(ops, sizes, repeat=3, tile_rows=0, font=None, workdir=None, threads=1):
+    """Benchmarks each operation in `ops` at each size name in `sizes`, yielding a record per case."""
+    font = font or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), fontsubset.SUBSET_TTF)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        sources = {}
+        for size_name in sizes:
+            size = SIZES[size_name]
+            for op in ops:
+                kind, params = CASES[op]
+                if (kind, size_name) not in sources:
+                    path = os.path.join(tmp, f"{kind}-{size_name}{_EXTENSIONS[kind]}")
+                    make_source(kind, size).save(path)
+                    sources[kind, size_name] = path
+                source = sources[kind, size_name]
+                job = dict(params, op=op, input=source,
+                           output=os.path.join(tmp, f"out-{op}-{size_name}{_EXTENSIONS[kind]}"),
+                           derivatives=None, png_optimize=None)
+                if op == "bake-title":
+                    job["font"] = font
+                if tile_rows:
+                    job["tile_rows"] = tile_rows
+                if threads > 1:
+                    job["threads"] = threads
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    case = pool.submit(_run_case, job, repeat).result()
+                pixels = size[0] * size[1]
+                best = min(case["seconds"])
+                yield {
+                    "op": op,
+                    "size": size_name,
+                    "width": size[0],
+                    "height": size[1],
+                    "source": kind,
+                    "source_bytes": os.path.getsize(source),
+                    "tile_rows": tile_rows or None,
+                    "threads": threads,
+                    "seconds": best,
+                    "median_seconds": statistics.median(case["seconds"]),
+                    "megapixels_per_second": pixels / best / 1e6,
+                    "peak_rss_mb": case["peak_rss_mb"],
+                    "baseline_rss_mb": case["baseline_rss_mb"],
+                }
+
+
+def environment():
+    """Describes the machine and library versions a run was made with."""
+    return {
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def write_results(path, records, settings):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "settings": settings, "results": records}, f, indent=2)
+        f.write("\n")
+
+
+def compare(records, baseline_path, max_slowdown):
+    """Compares `records` with an earlier results file; returns [(record, baseline seconds, ratio)] of regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["op"], r["size"], r.get("tile_rows"), r.get("threads", 1)): r for r in json.load(f)["results"]}
+    regressions = []
+    for record in records:
+        before = baseline.get((record["op"], record["size"], record["tile_rows"], record["threads"]))
+        if before is None:
+            continue
+        ratio = record["seconds"] / before["seconds"]
+        record["baseline_seconds"] = before["seconds"]
+        if ratio > max_slowdown:
+            regressions.append((record, before["seconds"], ratio))
+    return regressions
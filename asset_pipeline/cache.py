@@ -0,0 +1,115 @@
+"""Content-hash build cache so unchanged jobs are skipped between runs.
+
+A job's key covers the source image bytes, the job parameters and, for
+title baking, the font file. Outputs are also kept under objects/ by key,
+so an output that was deleted or overwritten is restored by copying
+instead of being regenerated.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+# Bump when an operation's output changes for the same inputs and parameters.
+CACHE_VERSION = 5
+
+_PATH_FIELDS = ("input", "output", "font")
+# Job fields that change how an output is produced but not its bytes.
+_UNHASHED_FIELDS = ("threads",)
+
+
+class BuildCache:
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self.objects_dir = os.path.join(directory, "objects")
+        self.outputs = {}
+        self.files = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.outputs = data["outputs"]
+                self.files = data["files"]
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "outputs": self.outputs, "files": self.files}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def file_hash(self, path):
+        """Returns the SHA-256 of a file, reusing the stored digest while size and mtime match."""
+        st = os.stat(path)
+        entry = self.files.get(path)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        self.files[path] = [st.st_size, st.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def job_key(self, job):
+        """Hashes everything that determines a job's output bytes."""
+        params = {k: v for k, v in job.items() if k not in _PATH_FIELDS and k not in _UNHASHED_FIELDS}
+        if params.get("derivatives"):
+            params["derivatives"] = {k: v for k, v in params["derivatives"].items() if k != "dir"}
+        params["input_hash"] = self.file_hash(job["input"])
+        if "font" in job:
+            params["font_hash"] = self.file_hash(job["font"])
+        params["output_ext"] = os.path.splitext(job["output"])[1].lower()
+        params["cache_version"] = CACHE_VERSION
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def _object_path(self, key, output):
+        return os.path.join(self.objects_dir, key + os.path.splitext(output)[1].lower())
+
+    def status(self, job, key):
+        """Returns "hit" if the output is current, "cached" if it can be restored, else None.
+
+        Changes nothing on disk. Side outputs such as derivatives are only
+        tracked, not cached: if any recorded for the key is missing, or none
+        are known yet, the job has to run.
+        """
+        output = job["output"]
+        entry = self.outputs.get(output)
+        if entry and entry["key"] == key:
+            if not all(os.path.exists(p) for p in entry.get("extra", [])):
+                return None
+            if os.path.exists(output):
+                st = os.stat(output)
+                if entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                    return "hit"
+        elif job.get("derivatives"):
+            return None
+        return "cached" if os.path.exists(self._object_path(key, output)) else None
+
+    def lookup(self, job, key):
+        """Returns "hit" if the output is current, "restored" if copied from the cache, else None."""
+        status = self.status(job, key)
+        if status != "cached":
+            return status
+        entry = self.outputs.get(job["output"])
+        return self._restore(job["output"], key, entry.get("extra", []) if entry and entry["key"] == key else [])
+
+    def _restore(self, output, key, extra):
+        shutil.copyfile(self._object_path(key, output), output)
+        self._record(output, key, extra)
+        return "restored"
+
+    def store(self, job, key, extra=()):
+        """Records a freshly generated output and keeps a copy of it by key.
+
+        `extra` lists side outputs written by the same job.
+        """
+        output = job["output"]
+        os.makedirs(self.objects_dir, exist_ok=True)
+        shutil.copyfile(output, self._object_path(key, output))
+        self._record(output, key, list(extra))
+
+    def _record(self, output, key, extra):
+        st = os.stat(output)
+        self.outputs[output] = {"key": key, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "extra": extra}
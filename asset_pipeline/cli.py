@@ -0,0 +1,526 @@
+"""Command-line entry point: python -m asset_pipeline <command>."""
+import argparse
+import heapq
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from . import (atlas, audit, benchmark, derivatives, fontsubset, golden, imageservice, placeholder, pngopt, profiling,
+               watch)
+from . import jobs as jobs_module
+from .cache import BuildCache
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MANIFEST = os.path.join(REPO_ROOT, "pipeline.json")
+DEFAULT_CACHE_DIR = os.path.join(REPO_ROOT, ".asset-cache")
+DEFAULT_GOLDEN_DIR = os.path.join(REPO_ROOT, "golden")
+
+
+def _report(result):
+    status = "ok" if result["ok"] else "FAILED"
+    if result.get("skipped"):
+        status = "skipped"
+    if result.get("cached"):
+        status = result["cached"]
+    print(f"[{status}] {result['seconds']:7.2f}s  {result['op']:<13} {os.path.relpath(result['output'], REPO_ROOT)}")
+    if result["error"]:
+        print(f"         {result['error']}")
+    if result.get("threshold") is not None:
+        print(f"         auto threshold {result['threshold']}")
+    if result.get("png"):
+        _report_png(*result["png"])
+    if result.get("jpeg"):
+        _report_jpeg(result["jpeg"])
+
+
+def _report_png(before, after, description):
+    print(f"         png {before / 1024:.0f} KB -> {after / 1024:.0f} KB, saved {(before - after) / 1024:.0f} KB "
+          f"[{description}]")
+
+
+def _report_jpeg(record):
+    line = f"         jpeg q{record['quality']} {record['subsampling']} {record['bytes'] / 1024:.0f} KB"
+    if "ssim" in record:
+        line += f", ssim {record['ssim']:.4f}"
+        if not record["target_met"]:
+            line += " (target not met)"
+    print(line)
+
+
+def _cached_result(job, status, seconds):
+    return {"op": job["op"], "input": job["input"], "output": job["output"], "ok": True, "error": None,
+            "cached": status, "seconds": seconds}
+
+
+def _check_cache(cache, job):
+    """Returns (key, cached result or None) for a job; key is None when the inputs can't be hashed."""
+    if cache is None:
+        return None, None
+    start = time.perf_counter()
+    try:
+        key = cache.job_key(job)
+    except OSError:
+        return None, None
+    status = cache.lookup(job, key)
+    if status is None:
+        return key, None
+    return key, _cached_result(job, status, time.perf_counter() - start)
+
+
+def _skipped_result(job, upstream):
+    return {"op": job["op"], "input": job["input"], "output": job["output"], "ok": False, "skipped": True,
+            "error": f"skipped: {os.path.relpath(upstream, REPO_ROOT)} failed", "seconds": 0.0}
+
+
+def run_jobs(jobs, workers, cache=None, pool=None, profile=False, cprofile_dir=None):
+    """Runs `jobs` on a process pool in dependency order and returns their results.
+
+    A job starts as soon as the jobs producing its input have finished, so
+    independent branches run side by side; when a job fails, the jobs
+    downstream of it are skipped rather than run on a stale input. With a
+    `cache`, jobs whose inputs and parameters are unchanged are skipped or
+    restored from the cache instead of being run. A `pool` passed in is
+    used as is and left running. `profile` and `cprofile_dir` are passed
+    on to jobs_module.run_job.
+    """
+    graph = jobs_module.dependencies(jobs)
+    dependents = [[] for _ in jobs]
+    for i, upstream in enumerate(graph):
+        for u in upstream:
+            dependents[u].append(i)
+    waiting = [len(upstream) for upstream in graph]
+    failed_upstream = {}
+    ready = [i for i, count in enumerate(waiting) if not count]
+    running = {}
+    results = []
+
+    def finish(i, result, key=None):
+        if result["ok"] and cache is not None and key is not None:
+            cache.store(jobs[i], key, result["extra_outputs"])
+        results.append(result)
+        _report(result)
+        for d in dependents[i]:
+            if not result["ok"]:
+                failed_upstream.setdefault(d, jobs[i]["output"])
+            waiting[d] -= 1
+            if not waiting[d]:
+                heapq.heappush(ready, d)
+
+    own_pool = pool is None and workers > 1
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while ready or running:
+            while ready:
+                i = heapq.heappop(ready)
+                if i in failed_upstream:
+                    finish(i, _skipped_result(jobs[i], failed_upstream[i]))
+                    continue
+                key, cached = _check_cache(cache, jobs[i])
+                if cached:
+                    finish(i, cached)
+                elif pool is None:
+                    finish(i, jobs_module.run_job(jobs[i], profile, cprofile_dir), key)
+                else:
+                    running[pool.submit(jobs_module.run_job, jobs[i], profile, cprofile_dir)] = (i, key)
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, key = running.pop(future)
+                    finish(i, future.result(), key)
+    finally:
+        if own_pool:
+            pool.shutdown()
+        if cache is not None:
+            cache.save()
+    return results
+
+
+def plan_jobs(jobs, cache=None):
+    """Returns (job, status) for the jobs a run would not skip, without changing anything.
+
+    The status is "restore" when the cache holds the output, "stale" when
+    the job has to run, or "upstream" when a job it depends on has to run.
+    Without a cache every job is stale.
+    """
+    graph = jobs_module.dependencies(jobs)
+    index = {id(job): i for i, job in enumerate(jobs)}
+    reruns = set()
+    plan = []
+    for wave in jobs_module.schedule(jobs, graph):
+        for job in wave:
+            i = index[id(job)]
+            if graph[i] & reruns:
+                status = "upstream"
+            elif cache is None:
+                status = "stale"
+            else:
+                try:
+                    status = {"hit": None, "cached": "restore"}.get(cache.status(job, cache.job_key(job)), "stale")
+                except OSError:
+                    status = "stale"
+            if status in ("stale", "upstream"):
+                reruns.add(i)
+            if status:
+                plan.append((job, status))
+    return plan
+
+
+def _run_manifest_jobs(manifest, jobs, workers, cache, pool=None, report=None, cprofile_dir=None):
+    """Runs `jobs`, updates the asset manifest and any stale atlases, and prints a summary.
+
+    With a `report` path, the jobs are profiled and their metrics written
+    there. Returns the number of jobs and atlases that failed.
+    """
+    start = time.perf_counter()
+    results = run_jobs(jobs, workers, cache, pool, profile=bool(report), cprofile_dir=cprofile_dir)
+    if manifest["asset_manifest"]:
+        static = []
+        if manifest["placeholders"]:
+            static = placeholder.static_results(manifest["placeholder_images"], manifest["placeholders"],
+                                                manifest["asset_manifest"], manifest["root"])
+        derivatives.update_asset_manifest(manifest["asset_manifest"], manifest["root"], results + static)
+    failed = sum(not r["ok"] for r in results)
+    atlases_failed = _build_atlases(manifest)
+    print(f"{len(results) - failed}/{len(results)} jobs succeeded in {time.perf_counter() - start:.2f}s "
+          f"({workers} workers)")
+    if report:
+        _write_profile(report, results, manifest["root"])
+    return failed + atlases_failed
+
+
+def _write_profile(path, results, root):
+    rows = profiling.write_report(path, results, root)
+    totals = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in profiling.stage_totals(rows))
+    print(f"Stage totals: {totals or 'nothing ran'}")
+    for row in sorted(rows, key=lambda r: r["seconds"], reverse=True)[:5]:
+        if row["status"] in ("ok", "failed"):
+            print(f"  {row['seconds']:7.2f}s  {row['output']}")
+    print(f"Wrote metrics for {len(rows)} jobs to {path}")
+
+
+def _build_atlases(manifest):
+    """Rebuilds the manifest's out-of-date sprite atlases; returns how many failed."""
+    failed = 0
+    for settings in manifest["atlases"]:
+        if not atlas.is_stale(settings):
+            continue
+        start = time.perf_counter()
+        try:
+            atlas_map = atlas.build(settings)
+        except (OSError, ValueError) as e:
+            print(f"[FAILED] atlas {os.path.relpath(settings['output'], REPO_ROOT)}: {e}")
+            failed += 1
+            continue
+        sheets = ", ".join(f"{s['width']}x{s['height']}" for s in atlas_map["sheets"])
+        print(f"[ok] {time.perf_counter() - start:7.2f}s  atlas         "
+              f"{os.path.relpath(settings['output'], REPO_ROOT)} ({len(atlas_map['sprites'])} sprites, {sheets})")
+    return failed
+
+
+def cmd_run(args):
+    manifest = jobs_module.load_manifest(args.manifest)
+    jobs = manifest["jobs"]
+    if args.ops:
+        jobs = [job for job in jobs if job["op"] in args.ops]
+    if args.tile_rows:
+        # Only where it applies, since the build cache hashes it.
+        for job in jobs:
+            if jobs_module.runs_tiled(dict(job, tile_rows=args.tile_rows)):
+                job["tile_rows"] = args.tile_rows
+    _apply_threads(jobs, args.threads)
+    cache = None if args.no_cache else BuildCache(args.cache_dir)
+    if args.dry_run:
+        return _dry_run(manifest, jobs, cache)
+    failed = _run_manifest_jobs(manifest, jobs, args.workers, cache, report=args.profile,
+                                cprofile_dir=args.cprofile_dir)
+    return 1 if failed else 0
+
+
+def _dry_run(manifest, jobs, cache):
+    """Lists the outputs a run would rebuild or restore, and the stale atlases."""
+    plan = plan_jobs(jobs, cache)
+    for job, status in plan:
+        print(f"[{status}] {job['op']:<13} {os.path.relpath(job['output'], REPO_ROOT)}")
+    stale_atlases = [a for a in manifest["atlases"] if atlas.is_stale(a)]
+    for settings in stale_atlases:
+        print(f"[stale] {'atlas':<13} {os.path.relpath(settings['output'], REPO_ROOT)}")
+    rebuilt = sum(status != "restore" for _, status in plan)
+    print(f"{rebuilt} of {len(jobs)} outputs to rebuild, {len(plan) - rebuilt} to restore from the cache, "
+          f"{len(stale_atlases)} atlases to rebuild")
+    return 0
+
+
+def _apply_threads(jobs, threads):
+    if threads:
+        for job in jobs:
+            job["threads"] = threads
+
+
+def cmd_watch(args):
+    cache = None if args.no_cache else BuildCache(args.cache_dir)
+    # One pool for the whole session, so workers keep their decoded fonts between batches.
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+
+    def run_batch(manifest, jobs):
+        _apply_threads(jobs, args.threads)
+        _run_manifest_jobs(manifest, jobs, args.workers, cache, pool)
+
+    try:
+        manifest = jobs_module.load_manifest(args.manifest)
+        run_batch(manifest, manifest["jobs"])
+        watch.watch(args.manifest, run_batch, args.interval, args.debounce)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return 0
+
+
+def cmd_serve(args):
+    root = args.root or jobs_module.load_manifest(args.manifest)["root"]
+    server = imageservice.make_server(root, args.host, args.port, args.memory_mb,
+                                      None if args.no_disk_cache else args.cache_dir, args.upstream)
+    print(f"Serving {os.path.relpath(root, REPO_ROOT)}/images on http://{args.host}:{args.port}{imageservice.PREFIX}"
+          + (f", forwarding everything else to {args.upstream}" if args.upstream else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped serving")
+    finally:
+        server.server_close()
+    return 0
+
+
+def cmd_regress(args):
+    manifest = jobs_module.load_manifest(args.manifest)
+    jobs = manifest["jobs"]
+    _apply_threads(jobs, args.threads)
+    if not args.no_run:
+        cache = None if args.no_cache else BuildCache(args.cache_dir)
+        if _run_manifest_jobs(manifest, jobs, args.workers, cache):
+            print("Some jobs failed; not comparing")
+            return 1
+    paths = [job["output"] for job in jobs] + [p for a in manifest["atlases"] for p in atlas.built_sheets(a)]
+    root = manifest["root"]
+
+    if args.update:
+        changed = golden.update(args.golden, paths, root)
+        print(f"Updated {changed} of {len(paths)} golden images in {os.path.relpath(args.golden, REPO_ROOT)}")
+        return 0
+
+    start = time.perf_counter()
+    failed = 0
+    for record in golden.check(args.golden, paths, root, args.tolerance, args.max_changed,
+                               args.max_hash_distance, args.diff_dir):
+        failed += not record["ok"]
+        details = []
+        if "hash_distance" in record:
+            details.append(f"hash distance {record['hash_distance']}")
+        if "changed" in record:
+            details.append(f"{record['changed']:.3%} of pixels changed, up to {record['max_diff']}")
+        status = record["status"] if record["ok"] else record["status"].upper()
+        print(f"[{status}] {record['path']}" + (f" ({', '.join(details)})" if details else ""))
+        if "heatmap" in record:
+            print(f"  heatmap: {os.path.relpath(record['heatmap'], REPO_ROOT)}")
+    print(f"{len(paths) - failed}/{len(paths)} outputs match their golden images "
+          f"({time.perf_counter() - start:.2f}s)")
+    if failed:
+        print("Run with --update to accept the changes")
+    return 1 if failed else 0
+
+
+def _kb(size):
+    return f"{size / 1024:9.1f} KB"
+
+
+def cmd_audit(args):
+    manifest = jobs_module.load_manifest(args.manifest)
+    settings = manifest["audit"]
+    for name in ("max_file_bytes", "max_total_bytes", "max_hash_distance"):
+        if getattr(args, name) is not None:
+            settings[name] = getattr(args, name)
+    root = manifest["root"]
+    records = audit.scan(settings, root, [job["input"] for job in manifest["jobs"]], audit.derived_paths(manifest))
+
+    unreferenced = [r for r in records if not r["referenced"]]
+    print(f"Unreferenced ({len(unreferenced)} of {len(records)} images, "
+          f"{sum(r['bytes'] for r in unreferenced) / 1024 / 1024:.1f} MB):")
+    for record in unreferenced:
+        print(f"  {_kb(record['bytes'])}  {record['path']}" + ("  (pipeline input)" if record["pipeline_input"] else ""))
+
+    exact, near = audit.duplicates(records, settings["max_hash_distance"])
+    print(f"Duplicates ({len(exact)} identical groups, {len(near)} near pairs):")
+    for group in exact:
+        print(f"  identical: {', '.join(r['path'] for r in group)}")
+    for a, b, distance in near:
+        print(f"  distance {distance:2}: {a['path']}, {b['path']}")
+
+    over, total, total_over = audit.budget_violations(records, settings)
+    limit = settings["max_total_bytes"]
+    print(f"Total {total / 1024 / 1024:.1f} MB" + (f" of a {limit / 1024 / 1024:.1f} MB budget" if limit else ""))
+    for record, budget in over:
+        print(f"  OVER BUDGET {_kb(record['bytes'])} > {_kb(budget).strip()}  {record['path']}")
+    if total_over:
+        print(f"  OVER BUDGET total by {(total - limit) / 1024 / 1024:.1f} MB")
+
+    ranked = audit.savings(records, settings, root, estimate=args.estimate)
+    print(f"Biggest savings ({sum(r['saving'] for r in ranked) / 1024 / 1024:.1f} MB in all):")
+    for record in ranked[:args.top]:
+        print(f"  {_kb(record['saving'])}  {record['path']}: {'; '.join(record['reasons'])}")
+    return 1 if over or total_over else 0
+
+
+def cmd_subset_font(args):
+    count, sizes = fontsubset.build_subset(REPO_ROOT, args.manifest)
+    print(f"Subset {count} characters")
+    for path, size in sizes.items():
+        print(f"  {size / 1024:9.1f} KB  {os.path.relpath(path, REPO_ROOT)}")
+    return 0
+
+
+def cmd_optimize_png(args):
+    settings = pngopt.resolve_settings({"min_psnr": args.min_psnr})
+    total = 0
+    for path in args.paths:
+        before, after, description = pngopt.optimize_file(path, settings)
+        total += before - after
+        print(path)
+        _report_png(before, after, description)
+    print(f"Saved {total / 1024:.0f} KB in total")
+    return 0
+
+
+def cmd_bench(args):
+    records = []
+    print(f"{'op':<13} {'size':<7} {'seconds':>8} {'MP/s':>8} {'peak RSS':>9}")
+    for record in benchmark.run_benchmarks(args.ops, args.sizes, args.repeat, args.tile_rows,
+                                             threads=args.threads):
+        records.append(record)
+        rss = f"{record['peak_rss_mb']:6.0f} MB" if record["peak_rss_mb"] is not None else "       -"
+        print(f"{record['op']:<13} {record['size']:<7} {record['seconds']:8.3f} "
+              f"{record['megapixels_per_second']:8.1f} {rss}")
+    regressions = benchmark.compare(records, args.baseline, args.max_slowdown) if args.baseline else []
+    settings = {"repeat": args.repeat, "tile_rows": args.tile_rows or None, "threads": args.threads}
+    benchmark.write_results(args.output, records, settings)
+    print(f"Wrote {len(records)} results to {args.output}")
+    for record, before, ratio in regressions:
+        print(f"REGRESSION {record['op']} {record['size']}: {before:.3f}s -> {record['seconds']:.3f}s ({ratio:.2f}x)")
+    return 1 if regressions else 0
+
+
+def _add_run_arguments(parser):
+    parser.add_argument("manifest", nargs="?", default=DEFAULT_MANIFEST, help="job manifest (default: pipeline.json)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="process pool size")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="build cache location (default: .asset-cache)")
+    parser.add_argument("--no-cache", action="store_true", help="regenerate every output")
+    parser.add_argument("--threads", type=int, help="threads per job for work within one image "
+                                                    "(default: the manifest's \"threads\", or 1)")
+
+
+def _add_profile_arguments(parser):
+    parser.add_argument("--profile", metavar="REPORT",
+                        help="write per-job stage timings, bytes and peak memory to REPORT (.json or .csv)")
+    parser.add_argument("--cprofile-dir", help="write a cProfile dump of each job run to this directory")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m asset_pipeline", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the jobs in a manifest")
+    _add_run_arguments(run)
+    run.add_argument("--dry-run", action="store_true", help="list the outputs that are out of date and exit")
+    _add_profile_arguments(run)
+    run.add_argument("--tile-rows", type=int, default=0,
+                     help="process remove-bg and zoom-out jobs in strips of this many rows")
+    run.set_defaults(func=cmd_run, ops=None)
+
+    titles = commands.add_parser("titles", help="bake every title in the manifest's title spec")
+    _add_run_arguments(titles)
+    titles.add_argument("--dry-run", action="store_true", help="list the titles that are out of date and exit")
+    _add_profile_arguments(titles)
+    titles.set_defaults(func=cmd_run, ops=["bake-title"], tile_rows=0)
+
+    watch_parser = commands.add_parser("watch", help="rerun jobs as their source images and fonts change")
+    _add_run_arguments(watch_parser)
+    watch_parser.add_argument("--interval", type=float, default=watch.DEFAULT_INTERVAL,
+                              help="seconds between polls of the source files")
+    watch_parser.add_argument("--debounce", type=float, default=watch.DEFAULT_DEBOUNCE,
+                              help="seconds the files must stay unchanged before a batch runs")
+    watch_parser.set_defaults(func=cmd_watch)
+
+    optimize_png = commands.add_parser("optimize-png", help="optimise existing PNG files in place")
+    optimize_png.add_argument("paths", nargs="+")
+    optimize_png.add_argument("--min-psnr", type=float, default=pngopt.DEFAULT_MIN_PSNR,
+                              help="lowest acceptable PSNR for palette quantisation (dB)")
+    optimize_png.set_defaults(func=cmd_optimize_png)
+
+    bench = commands.add_parser("bench", help="benchmark the operations on synthetic images")
+    bench.add_argument("-o", "--output", default="benchmark-results.json", help="results file (JSON)")
+    bench.add_argument("--ops", nargs="+", choices=list(benchmark.CASES), default=list(benchmark.CASES))
+    bench.add_argument("--sizes", nargs="+", choices=list(benchmark.SIZES), default=list(benchmark.SIZES))
+    bench.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is reported")
+    bench.add_argument("--tile-rows", type=int, default=0, help="benchmark the tiled remove-bg and zoom-out paths")
+    bench.add_argument("--threads", type=int, default=1, help="threads per job for work within one image")
+    bench.add_argument("--baseline", help="earlier results file to compare against")
+    bench.add_argument("--max-slowdown", type=float, default=1.2,
+                       help="exit non-zero if a case is this many times slower than the baseline")
+    bench.set_defaults(func=cmd_bench)
+
+    serve = commands.add_parser("serve", help="serve resized and re-encoded images on demand")
+    serve.add_argument("manifest", nargs="?", default=DEFAULT_MANIFEST, help="job manifest whose root to serve")
+    serve.add_argument("--root", help="public directory to serve images from (default: the manifest's root)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=imageservice.DEFAULT_PORT)
+    serve.add_argument("--upstream", help="forward non-image requests here, e.g. http://localhost:3000")
+    serve.add_argument("--memory-mb", type=float, default=imageservice.DEFAULT_MEMORY_MB,
+                       help="memory cache size for generated variants")
+    serve.add_argument("--cache-dir", default=os.path.join(DEFAULT_CACHE_DIR, "images"),
+                       help="disk cache for generated variants (default: .asset-cache/images)")
+    serve.add_argument("--no-disk-cache", action="store_true", help="keep generated variants in memory only")
+    serve.set_defaults(func=cmd_serve)
+
+    regress = commands.add_parser("regress", help="compare the outputs with their golden images")
+    _add_run_arguments(regress)
+    regress.add_argument("--golden", default=DEFAULT_GOLDEN_DIR, help="golden image directory (default: golden)")
+    regress.add_argument("--update", action="store_true", help="store the current outputs as the golden images")
+    regress.add_argument("--no-run", action="store_true", help="compare the outputs on disk without running jobs")
+    regress.add_argument("--tolerance", type=int, default=golden.DEFAULT_TOLERANCE,
+                         help="largest per-channel difference (0-255) a pixel may have and still match")
+    regress.add_argument("--max-changed", type=float, default=golden.DEFAULT_MAX_CHANGED,
+                         help="fraction of pixels allowed beyond the tolerance")
+    regress.add_argument("--max-hash-distance", type=int, default=golden.DEFAULT_MAX_HASH_DISTANCE,
+                         help="perceptual hash bits allowed to differ")
+    regress.add_argument("--diff-dir", help="write heatmaps of changed images here, e.g. regress-diffs "
+                                            "(slower: changed images are then diffed per pixel)")
+    regress.set_defaults(func=cmd_regress)
+
+    audit_parser = commands.add_parser("audit", help="report unused, duplicate and over-budget images")
+    audit_parser.add_argument("manifest", nargs="?", default=DEFAULT_MANIFEST,
+                              help="job manifest whose \"audit\" block to use")
+    audit_parser.add_argument("--max-file-bytes", type=int, help="per-file budget (default: the manifest's)")
+    audit_parser.add_argument("--max-total-bytes", type=int, help="budget for all images (default: the manifest's)")
+    audit_parser.add_argument("--max-hash-distance", type=int,
+                              help=f"perceptual hash bits near duplicates may differ by "
+                                   f"(default: {audit.DEFAULT_MAX_HASH_DISTANCE})")
+    audit_parser.add_argument("--estimate", action="store_true",
+                              help="also estimate what re-encoding each image with the pipeline would save")
+    audit_parser.add_argument("--top", type=int, default=20, help="savings to list")
+    audit_parser.set_defaults(func=cmd_audit)
+
+    subset_font = commands.add_parser("subset-font", help="subset the title font to the characters in use")
+    subset_font.add_argument("--manifest", default=DEFAULT_MANIFEST, help="job manifest whose titles to include")
+    subset_font.set_defaults(func=cmd_subset_font)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Downscaled WebP/AVIF variants of job outputs and the asset manifest listing them."""
+import json
+import os
+
+from PIL import Image, features
+
+from . import parallel, transform
+
+DEFAULT_WIDTHS = (320, 640, 1280)
+DEFAULT_FORMATS = ("webp", "avif")
+DEFAULT_QUALITY = 80
+
+_EXTENSIONS = {"webp": ".webp", "avif": ".avif"}
+# Encoder options beyond quality; AVIF's default speed is very slow for a build step.
+_SAVE_OPTIONS = {"webp": {"method": 4}, "avif": {"speed": 8}}
+
+
+def resolve_settings(settings, root):
+    """Fills in defaults for a manifest "derivatives" block; returns None when disabled."""
+    if not settings:
+        return None
+    settings = dict(settings)
+    settings["widths"] = sorted(settings.get("widths", DEFAULT_WIDTHS))
+    settings["formats"] = [f for f in settings.get("formats", DEFAULT_FORMATS) if features.check(f)]
+    settings["quality"] = settings.get("quality", DEFAULT_QUALITY)
+    settings["dir"] = os.path.normpath(os.path.join(root, settings.get("dir", "images/variants")))
+    return settings
+
+
+def save_variant(img, fp, fmt, quality):
+    """Encodes `img` as `fmt` ("webp" or "avif") to a path or file object, with the build's encoder options."""
+    img.save(fp, fmt.upper(), quality=quality, **_SAVE_OPTIONS[fmt])
+
+
+def variant_paths(output_path, settings, source_width):
+    """Returns [(width, format, path)] for the variants of an output `source_width` pixels wide."""
+    widths = [w for w in settings["widths"] if w < source_width] or [source_width]
+    name = os.path.splitext(os.path.basename(output_path))[0]
+    return [
+        (width, fmt, os.path.join(settings["dir"], f"{name}-{width}w{_EXTENSIONS[fmt]}"))
+        for width in widths
+        for fmt in settings["formats"]
+    ]
+
+
+def make_derivatives(img, output_path, settings, threads=parallel.DEFAULT_THREADS):
+    """Writes the configured variants of `img` and returns a record for each one.
+
+    If `img` is a JPEG that has not been loaded yet, it is decoded at the
+    smallest draft scale that still covers the largest variant. `threads`
+    spreads each resize over bands of the image.
+    """
+    os.makedirs(settings["dir"], exist_ok=True)
+    width, height = img.size
+    paths = variant_paths(output_path, settings, width)
+    largest = max(w for w, _, _ in paths)
+    box = transform.draft(img, (largest, max(1, round(height * largest / width))))
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+
+    variants = []
+    resized = {}
+    for variant_width, fmt, path in paths:
+        if variant_width not in resized:
+            if variant_width == width:
+                resized[variant_width] = img
+            else:
+                size = (variant_width, max(1, round(height * variant_width / width)))
+                resized[variant_width] = parallel.resize(img, size, Image.Resampling.LANCZOS, box=box,
+                                                         reducing_gap=3.0, threads=threads)
+        variant = resized[variant_width]
+        save_variant(variant, path, fmt, settings["quality"])
+        variants.append({
+            "path": path,
+            "width": variant.width,
+            "height": variant.height,
+            "format": fmt,
+            "bytes": os.path.getsize(path),
+        })
+    return variants
+
+
+def update_asset_manifest(path, root, results):
+    """Merges what job results record into the JSON asset manifest at `path`.
+
+    That is their variants, crop offsets, placeholders and JPEG settings.
+    Entries are keyed by the output's path relative to `root` (the public
+    directory), so the client can look up an asset by the URL it already uses.
+    """
+    manifest = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    def rel(p):
+        return os.path.relpath(p, root).replace(os.sep, "/")
+
+    for result in results:
+        recorded = [k for k in ("crop", "placeholder", "color", "jpeg") if result.get(k)]
+        if not result["ok"] or (result.get("variants") is None and not recorded):
+            continue
+        entry = manifest.setdefault(rel(result["output"]), {})
+        if result.get("variants") is not None:
+            entry["width"], entry["height"] = result["width"], result["height"]
+            entry["variants"] = [dict(v, path=rel(v["path"])) for v in result["variants"]]
+        for key in recorded:
+            entry[key] = result[key]
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, path)
@@ -0,0 +1,140 @@
+"""Subsets ZhiMangXing-Regular.ttf down to the characters the site actually uses.
+
+Characters are collected from the string literals of the root-level
+Python scripts, the titles in pipeline.json and its title spec, and every
+non-ASCII character in the client source; those the font has no glyph
+for, such as emoji, are dropped. The result is written as a subset TTF
+(for the Python renderers) and WOFF2 (for browsers), plus a CSS
+@font-face whose unicode-range limits it to those characters, so any
+other text still falls back to the Google Fonts copy.
+
+Needs fontTools, and brotli for the WOFF2 output (see requirements.txt).
+"""
+import ast
+import glob
+import os
+
+from . import jobs
+
+SOURCE_FONT = "client/public/fonts/ZhiMangXing-Regular.ttf"
+SUBSET_TTF = "client/public/fonts/ZhiMangXing-Regular.subset.ttf"
+SUBSET_WOFF2 = "client/public/fonts/ZhiMangXing-Regular.subset.woff2"
+FONT_FACE_CSS = "client/src/zhimangxing-subset.css"
+
+FAMILY = "Zhi Mang Xing"
+CLIENT_SOURCES = ("client/index.html", "client/src/**/*.ts", "client/src/**/*.tsx", "client/src/**/*.css")
+
+# Always keep printable ASCII so digits and Latin text render in the display face too.
+_ASCII = {chr(c) for c in range(0x20, 0x7F)}
+
+# The font has no glyph hinting, so FreeType autohints it and derives its CJK
+# blue zones from these reference characters (FreeType's afblue.dat). Without
+# them the subset rasterises some titles a pixel differently from the full font.
+_AUTOHINT_REFERENCE = (
+    "他们你來們到和地对對就席我时時會来為能舰說说这這齊军同已愿既星是景民照现現理用置要軍那配里開雷露面顾"
+    "个为人他以们你來個們到和大对對就我时時有来來為要說说主些因它想意理生當看着置者自著裡过还进進過道還里面"
+    "些们你來們到和地她将將就年得情最样樣理能說说这這通即吗吧听呢品响嗎师師收断斷明眼間间际陈限除陳随際隨"
+    "事前學将將情想或政斯新样樣民沒没然特现現球第經谁起例別别制动動吗嗎增指明朝期构物确种調调費费那都間间田囗"
+)
+
+
+def _python_strings(path):
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    return [node.value for node in ast.walk(tree) if isinstance(node, ast.Constant) and isinstance(node.value, str)]
+
+
+def collect_characters(repo_root, manifest_path=None):
+    """Returns the sorted set of characters the titles and the client source use."""
+    chars = set(_ASCII) | set(_AUTOHINT_REFERENCE)
+    for path in glob.glob(os.path.join(repo_root, "*.py")):
+        for value in _python_strings(path):
+            chars.update(value)
+
+    if manifest_path and os.path.exists(manifest_path):
+        for job in jobs.load_manifest(manifest_path)["jobs"]:
+            chars.update(job.get("text", ""))
+
+    for pattern in CLIENT_SOURCES:
+        for path in glob.glob(os.path.join(repo_root, pattern), recursive=True):
+            with open(path, encoding="utf-8") as f:
+                chars.update(ch for ch in f.read() if ord(ch) > 0x7F)
+
+    return sorted(ch for ch in chars if ch.isprintable())
+
+
+def font_characters(path):
+    """The characters the font at `path` maps to glyphs."""
+    try:
+        from fontTools.ttLib import TTFont
+    except ImportError:
+        raise RuntimeError("Font subsetting needs fontTools: pip install fonttools brotli")
+    with TTFont(path, lazy=True) as font:
+        return {chr(cp) for cp in font.getBestCmap()}
+
+
+def _unicode_ranges(chars):
+    """Collapses code points into CSS unicode-range entries."""
+    points = sorted(ord(ch) for ch in chars)
+    ranges = []
+    start = prev = points[0]
+    for cp in points[1:]:
+        if cp != prev + 1:
+            ranges.append((start, prev))
+            start = cp
+        prev = cp
+    ranges.append((start, prev))
+    return ", ".join(f"U+{a:X}" if a == b else f"U+{a:X}-{b:X}" for a, b in ranges)
+
+
+def subset_font(source, chars, ttf_output, woff2_output=None):
+    """Writes `source` reduced to `chars` as TTF and, if asked, WOFF2."""
+    try:
+        from fontTools import subset
+    except ImportError:
+        raise RuntimeError("Font subsetting needs fontTools: pip install fonttools brotli")
+
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+
+    font = subset.load_font(source, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text="".join(chars))
+    subsetter.subset(font)
+
+    subset.save_font(font, ttf_output, options)
+    if woff2_output:
+        options.flavor = "woff2"
+        subset.save_font(font, woff2_output, options)
+
+
+def write_font_face_css(path, chars, woff2_url, ttf_url):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("/* Generated by python -m asset_pipeline subset-font. Do not edit. */\n")
+        f.write("@font-face {\n")
+        f.write(f'  font-family: "{FAMILY}";\n')
+        f.write(f'  src: url("{woff2_url}") format("woff2"), url("{ttf_url}") format("truetype");\n')
+        f.write("  font-display: swap;\n")
+        f.write(f"  unicode-range: {_unicode_ranges(chars)};\n")
+        f.write("}\n")
+
+
+def build_subset(repo_root, manifest_path=None):
+    """Regenerates the subset fonts and @font-face CSS; returns (character count, sizes)."""
+    source = os.path.join(repo_root, SOURCE_FONT)
+    # The unicode-range must not claim characters the subset can't draw.
+    available = font_characters(source)
+    chars = [ch for ch in collect_characters(repo_root, manifest_path) if ch in available]
+    ttf = os.path.join(repo_root, SUBSET_TTF)
+    woff2 = os.path.join(repo_root, SUBSET_WOFF2)
+
+    subset_font(source, chars, ttf, woff2)
+    public = os.path.join(repo_root, "client", "public")
+    write_font_face_css(
+        os.path.join(repo_root, FONT_FACE_CSS), chars,
+        "/" + os.path.relpath(woff2, public).replace(os.sep, "/"),
+        "/" + os.path.relpath(ttf, public).replace(os.sep, "/"),
+    )
+    return len(chars), {path: os.path.getsize(path) for path in (source, ttf, woff2)}
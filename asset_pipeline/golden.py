@@ -0,0 +1,178 @@
+"""Golden-image regression checks for the generated assets.
+
+`update` stores a copy of each output, with its SHA-256 and perceptual
+hash, under a golden directory. `check` compares fresh outputs with them
+in stages, each only run when the previous one could not decide:
+
+1. Identical bytes pass straight away; this is the common case, as the
+   pipeline's outputs are deterministic.
+2. Otherwise a 64-bit DCT hash of a small greyscale copy (JPEGs decoded
+   at draft scale) is compared with the stored one. A large distance is
+   a change without looking further.
+3. Otherwise both images are decoded and diffed per pixel. Differences
+   within `tolerance`, such as an encoder update's rounding, pass unless
+   more than `max_changed` of the pixels exceed it.
+
+Only with a `diff_dir` are the failures diffed anyway, for a heatmap:
+the golden image greyed out, with the changed pixels in red by how much
+they changed.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+from PIL import Image
+
+from . import transform
+
+DEFAULT_TOLERANCE = 8
+DEFAULT_MAX_CHANGED = 0.001
+DEFAULT_MAX_HASH_DISTANCE = 10
+HEATMAP_MAX_SIZE = 1024
+
+_HASH_SIZE = 32
+_HASH_BITS = 8
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _pixels(img):
+    """Premultiplied float RGB of `img`, so invisible colour under transparent pixels doesn't count."""
+    pixels = np.asarray(img.convert("RGBA"), dtype=np.float32)
+    return pixels[..., :3] * (pixels[..., 3:] / 255.0)
+
+
+def _dct_matrix(n):
+    k = np.arange(n)
+    return np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+
+
+_DCT = _dct_matrix(_HASH_SIZE)
+
+
+def perceptual_hash(path):
+    """64-bit DCT hash of the image at `path`, as 16 hex digits."""
+    with Image.open(path) as img:
+        transform.draft(img, (_HASH_SIZE * 2, _HASH_SIZE * 2))
+        small = img.convert("RGBA").resize((_HASH_SIZE, _HASH_SIZE), Image.Resampling.BOX)
+    grey = _pixels(small) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    coefficients = (_DCT @ grey @ _DCT.T)[:_HASH_BITS, :_HASH_BITS].ravel()[1:]
+    # 63 low-frequency coefficients (the DC term says nothing about structure)
+    # compared with their median, plus a leading zero bit.
+    bits = coefficients > np.median(coefficients)
+    return f"{int(''.join('1' if b else '0' for b in bits), 2):016x}"
+
+
+def hash_distance(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def pixel_diff(golden_path, path):
+    """Per-pixel largest channel difference as a uint8 array, or None if the sizes differ."""
+    with Image.open(golden_path) as golden, Image.open(path) as current:
+        if golden.size != current.size:
+            return None
+        diff = np.abs(_pixels(golden) - _pixels(current)).max(axis=-1)
+    return np.rint(diff).astype(np.uint8)
+
+
+def write_heatmap(path, golden_path, diff, tolerance):
+    """Writes the golden image greyed out with pixels differing by more than `tolerance` in red."""
+    with Image.open(golden_path) as golden:
+        grey = np.asarray(golden.convert("L"), dtype=np.float32) * 0.4 + 80
+    heat = np.where(diff > tolerance, 80 + diff.astype(np.float32) * (175 / 255), 0)[..., None]
+    red = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+    pixels = grey[..., None] * (1 - heat / 255) + 255 * red * (heat / 255)
+    img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+    img.thumbnail((HEATMAP_MAX_SIZE, HEATMAP_MAX_SIZE), Image.Resampling.BOX)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    img.save(path, "PNG")
+
+
+def _index_path(golden_dir):
+    return os.path.join(golden_dir, "index.json")
+
+
+def load_index(golden_dir):
+    path = _index_path(golden_dir)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _rel(path, root):
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def update(golden_dir, paths, root):
+    """Stores the images at `paths` as the golden references; returns how many changed."""
+    index = load_index(golden_dir)
+    changed = 0
+    for path in paths:
+        key = _rel(path, root)
+        digest = file_sha256(path)
+        if index.get(key, {}).get("sha256") == digest:
+            continue
+        target = os.path.join(golden_dir, "files", key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target)
+        index[key] = {"sha256": digest, "phash": perceptual_hash(path)}
+        changed += 1
+    tmp_path = _index_path(golden_dir) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(index.items())), f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, _index_path(golden_dir))
+    return changed
+
+
+def check(golden_dir, paths, root, tolerance=DEFAULT_TOLERANCE, max_changed=DEFAULT_MAX_CHANGED,
+          max_hash_distance=DEFAULT_MAX_HASH_DISTANCE, diff_dir=None):
+    """Yields a record per path: {"path", "status", "ok", ...}.
+
+    The status is "identical", "equivalent" (within tolerance), "changed",
+    "resized", "new" (no golden) or "missing" (golden but no output).
+    The pixel diff only runs when the perceptual hashes are close, to
+    confirm the match, or with `diff_dir`, for heatmaps of changed images.
+    """
+    index = load_index(golden_dir)
+    for path in paths:
+        key = _rel(path, root)
+        golden = index.get(key)
+        record = {"path": key}
+        if golden is None:
+            yield dict(record, status="new", ok=False)
+            continue
+        if not os.path.exists(path):
+            yield dict(record, status="missing", ok=False)
+            continue
+        if file_sha256(path) == golden["sha256"]:
+            yield dict(record, status="identical", ok=True)
+            continue
+
+        golden_path = os.path.join(golden_dir, "files", key)
+        record["hash_distance"] = hash_distance(perceptual_hash(path), golden["phash"])
+        similar = record["hash_distance"] <= max_hash_distance
+        if not similar and not diff_dir:
+            yield dict(record, status="changed", ok=False)
+            continue
+        diff = pixel_diff(golden_path, path)
+        if diff is None:
+            yield dict(record, status="resized", ok=False)
+            continue
+        record["changed"] = float((diff > tolerance).mean())
+        record["max_diff"] = int(diff.max())
+        ok = similar and record["changed"] <= max_changed
+        if not ok and diff_dir:
+            record["heatmap"] = os.path.join(diff_dir, os.path.splitext(key)[0] + ".diff.png")
+            write_heatmap(record["heatmap"], golden_path, diff, tolerance)
+        yield dict(record, status="equivalent" if ok else "changed", ok=ok)
@@ -0,0 +1,312 @@
+"""On-demand resized and re-encoded images, served over HTTP.
+
+GET /images/<path>?w=<width>&format=<fmt>&q=<quality> returns the image
+under the public directory scaled down to `w` pixels wide and encoded as
+`fmt` (webp, avif, jpeg, png, or auto to pick from the Accept header).
+Without any of these the file is served as is. Variants are generated on
+first request with the pipeline's own resize and encoders, then kept in a
+memory LRU bounded by bytes, backed by a disk cache that survives
+restarts. Responses carry an ETag derived from the source file's size and
+mtime plus the parameters, so revalidation never decodes anything.
+
+With an `upstream`, every other request is forwarded there, so the
+service can sit in front of the express server; without one it only
+serves images, beside it.
+"""
+import hashlib
+import http.client
+import io
+import os
+import threading
+import urllib.parse
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image, features
+
+from . import derivatives, jpegenc, transform
+
+DEFAULT_PORT = 3001
+DEFAULT_MEMORY_MB = 64
+# What transparent sources are flattened onto when JPEG is asked for.
+JPEG_BACKGROUND = (255, 255, 255)
+PREFIX = "/images/"
+# Bump when a variant's bytes change for the same source and parameters.
+VARIANT_VERSION = 2
+
+FORMATS = {
+    "webp": "image/webp",
+    "avif": "image/avif",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+DEFAULT_QUALITIES = {"webp": derivatives.DEFAULT_QUALITY, "avif": derivatives.DEFAULT_QUALITY,
+                     "jpeg": jpegenc.DEFAULT_QUALITY}
+_EXTENSIONS = {".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png", ".webp": "webp", ".avif": "avif"}
+# Headers not to pass on when proxying (RFC 9110 section 7.6.1).
+_HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+               "transfer-encoding", "upgrade"}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class VariantCache:
+    """An LRU of encoded variants bounded by total bytes, in front of a directory of them."""
+
+    def __init__(self, max_bytes, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Returns the cached bytes for `key` and where they came from ("memory" or "disk"), or (None, None)."""
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+                return data, "memory"
+        if self.directory is None:
+            return None, None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None, None
+        self._remember(key, data)
+        return data, "disk"
+
+    def put(self, key, data):
+        if self.directory is not None:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self._remember(key, data)
+
+    def _remember(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def resolve_path(root, url_path):
+    """The file under `root` for a URL path below PREFIX; raises RequestError if there is none."""
+    images = os.path.realpath(os.path.join(root, "images"))
+    name = urllib.parse.unquote(url_path[len(PREFIX):])
+    if "\0" in name:
+        raise RequestError(HTTPStatus.NOT_FOUND, "Not found")
+    path = os.path.realpath(os.path.join(images, name))
+    if os.path.commonpath([path, images]) != images:
+        raise RequestError(HTTPStatus.NOT_FOUND, "Not found")
+    if os.path.splitext(path)[1].lower() not in _EXTENSIONS or not os.path.isfile(path):
+        raise RequestError(HTTPStatus.NOT_FOUND, "Not found")
+    return path
+
+
+def negotiate(accept, source_format="jpeg"):
+    """The best variant format an Accept header allows: AVIF, then WebP.
+
+    Otherwise JPEG for JPEG sources and PNG for the rest, which may have
+    an alpha channel JPEG can't carry.
+    """
+    accepted = {part.split(";")[0].strip().lower() for part in (accept or "").split(",")}
+    for fmt in ("avif", "webp"):
+        if FORMATS[fmt] in accepted and features.check(fmt):
+            return fmt
+    return "jpeg" if source_format == "jpeg" else "png"
+
+
+def parse_params(query, source_format, accept=None):
+    """Validates the query parameters; returns {"width", "format", "quality", "negotiated"}.
+
+    Returns None when there is no "w", "format" or "q", for the file as
+    is; other parameters, such as cache busters, are ignored.
+    """
+    params = urllib.parse.parse_qs(query, keep_blank_values=True)
+    if not any(name in params for name in ("w", "format", "q")):
+        return None
+
+    def single(name):
+        values = params.get(name)
+        return values[-1] if values else None
+
+    width = single("w")
+    if width is not None:
+        if not width.isdecimal() or not 0 < int(width) <= 16384:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Bad width {width!r}")
+        width = int(width)
+    fmt = (single("format") or source_format).lower()
+    fmt = {"jpg": "jpeg"}.get(fmt, fmt)
+    negotiated = fmt == "auto"
+    if negotiated:
+        fmt = negotiate(accept, source_format)
+    if fmt not in FORMATS or (fmt in ("webp", "avif") and not features.check(fmt)):
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"Unsupported format {fmt!r}")
+    quality = single("q")
+    if quality is not None:
+        if not quality.isdecimal() or not 1 <= int(quality) <= 100:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Bad quality {quality!r}")
+        quality = int(quality)
+    if fmt == "png":
+        quality = None
+    elif quality is None:
+        quality = DEFAULT_QUALITIES[fmt]
+    return {"width": width, "format": fmt, "quality": quality, "negotiated": negotiated}
+
+
+def variant_key(path, params):
+    """Identifies a variant by its source's identity and the parameters; doubles as its ETag."""
+    st = os.stat(path)
+    identity = [VARIANT_VERSION, path, st.st_size, st.st_mtime_ns,
+                params and [params["width"], params["format"], params["quality"]]]
+    return hashlib.sha256(repr(identity).encode()).hexdigest()
+
+
+def render(path, params):
+    """Encodes the image at `path` per `params`; the width is capped at the source's."""
+    with Image.open(path) as img:
+        width, height = img.size
+        target = min(params["width"] or width, width)
+        if target != width:
+            size = (target, max(1, round(height * target / width)))
+            box = transform.draft(img, size)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+        if target != width:
+            img = img.resize(size, Image.Resampling.LANCZOS, box=box, reducing_gap=3.0)
+        if params["format"] == "jpeg":
+            if img.mode == "RGBA":
+                flat = Image.new("RGB", img.size, JPEG_BACKGROUND)
+                flat.paste(img, mask=img)
+                img = flat
+            return jpegenc.encode(img, jpegenc.resolve_settings(None, params["quality"]))[0]
+        buffer = io.BytesIO()
+        if params["format"] == "png":
+            img.save(buffer, "PNG", optimize=True)
+        else:
+            derivatives.save_variant(img, buffer, params["format"], params["quality"])
+        return buffer.getvalue()
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ImageRequestHandler(BaseHTTPRequestHandler):
+    server_version = "asset-pipeline-images"
+    # Set by serve().
+    root = None
+    cache = None
+    upstream = None
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _handle(self, send_body):
+        url = urllib.parse.urlsplit(self.path)
+        if not url.path.startswith(PREFIX):
+            if self.upstream:
+                self._proxy(send_body)
+            else:
+                self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        try:
+            path = resolve_path(self.root, url.path)
+            params = parse_params(url.query, _EXTENSIONS[os.path.splitext(path)[1].lower()],
+                                  self.headers.get("Accept"))
+            key = variant_key(path, params)
+        except RequestError as e:
+            self.send_error(e.status, str(e))
+            return
+
+        etag = f'"{key[:32]}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if params and params["negotiated"]:
+            headers["Vary"] = "Accept"
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self._send(HTTPStatus.NOT_MODIFIED, headers)
+            return
+
+        if params is None:
+            with open(path, "rb") as f:
+                data = f.read()
+            content_type, source = FORMATS[_EXTENSIONS[os.path.splitext(path)[1].lower()]], "file"
+        else:
+            data, source = self.cache.get(key)
+            if data is None:
+                try:
+                    data = render(path, params)
+                except (OSError, ValueError, Image.DecompressionBombError) as e:
+                    self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+                    return
+                self.cache.put(key, data)
+                source = "generated"
+            content_type = FORMATS[params["format"]]
+        headers.update({"Content-Type": content_type, "Content-Length": str(len(data)), "X-Variant-Cache": source})
+        self._send(HTTPStatus.OK, headers, data if send_body else None)
+
+    def _send(self, status, headers, body=None):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _proxy(self, send_body):
+        upstream = urllib.parse.urlsplit(self.upstream)
+        connection = http.client.HTTPConnection(upstream.hostname, upstream.port or 80, timeout=30)
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in _HOP_BY_HOP}
+        try:
+            connection.request(self.command, self.path, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+        except OSError as e:
+            self.send_error(HTTPStatus.BAD_GATEWAY, str(e))
+            return
+        finally:
+            connection.close()
+        self.send_response(response.status, response.reason)
+        for name, value in response.getheaders():
+            if name.lower() not in _HOP_BY_HOP and name.lower() != "content-length":
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def make_server(root, host="127.0.0.1", port=DEFAULT_PORT, memory_mb=DEFAULT_MEMORY_MB, cache_dir=None,
+                upstream=None):
+    """Builds (without starting) a threaded server for the images under `root`."""
+    handler = type("Handler", (ImageRequestHandler,), {
+        "root": os.path.abspath(root),
+        "cache": VariantCache(int(memory_mb * 1024 * 1024), cache_dir),
+        "upstream": upstream,
+    })
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,321 @@
+"""Manifest jobs and the operations they run."""
+import cProfile
+import json
+import os
+import time
+
+from PIL import Image
+
+from . import atlas, audit, background, derivatives, jpegenc, parallel, placeholder, pngopt, profiling, text, tiled, transform
+
+# Generated by `python -m asset_pipeline subset-font`; rerun it after adding new title text.
+DEFAULT_FONT = "fonts/ZhiMangXing-Regular.subset.ttf"
+
+
+def _remove_bg(img, job):
+    threshold = job.get("threshold", background.DEFAULT_THRESHOLD)
+    if job.get("mode") == "border":
+        return background.remove_border_background(img, threshold, job.get("feather", 0))
+    return background.remove_white_background(img, threshold, job.get("threads", parallel.DEFAULT_THREADS))
+
+
+def _crop(img, job):
+    return transform.crop_to_content(img, job.get("box"))
+
+
+def _bake_title(img, job):
+    font_size = text.resolve_font_size(
+        img.size,
+        font_size=job.get("font_size"),
+        font_size_ratio=job.get("font_size_ratio"),
+        relative_to=job.get("relative_to", "height"),
+    )
+    return text.bake_title(
+        img,
+        job["text"],
+        job["font"],
+        font_size,
+        job["y"],
+        anchor=job.get("anchor", "top"),
+        fill=job.get("fill", (40, 20, 10)),
+        shadow_fill=job.get("shadow_fill"),
+        shadow_offset=job.get("shadow_offset", 0),
+    )
+
+
+def _zoom_out(img, job):
+    return transform.zoom_out(img, job.get("scale", 0.65), job.get("fill", (248, 248, 248)),
+                              job.get("threads", parallel.DEFAULT_THREADS))
+
+
+def _circular_mask(img, job):
+    return transform.make_circular(img, job.get("size"), job.get("threads", parallel.DEFAULT_THREADS))
+
+
+def _mask(img, job):
+    size = job.get("size")
+    if isinstance(size, int):
+        size = (size, size)
+    params = {name: job[name] for name in ("radius", "inner", "outer") if name in job}
+    return transform.fit_mask(img, job.get("shape", "circle"), size, job.get("fill"),
+                              job.get("threads", parallel.DEFAULT_THREADS), **params)
+
+
+OPERATIONS = {
+    "remove-bg": _remove_bg,
+    "crop": _crop,
+    "bake-title": _bake_title,
+    "zoom-out": _zoom_out,
+    "circular-mask": _circular_mask,
+    "mask": _mask,
+}
+
+
+# Background-removal outputs are cropped to their content unless the job sets "crop": false.
+AUTO_CROP_OPERATIONS = {"remove-bg"}
+
+
+def _auto_crop(img, job):
+    """Crops to the content box plus "crop_padding"; returns (img, crop record or None)."""
+    box = transform.content_box(img, job.get("crop_padding", 0))
+    if not box:
+        return img, None
+    return img.crop(box), transform.crop_record(box, img.size)
+
+
+def _write_crop_sidecar(output, record):
+    """Writes <output name>.crop.json describing where the cropped image sat in the original."""
+    path = os.path.splitext(output)[0] + ".crop.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+        f.write("\n")
+    return path
+
+
+def _remove_bg_tiled(job):
+    crop = job.get("crop", True)
+    box, size, threshold = tiled.remove_white_background_file(
+        job["input"], job["output"], job.get("threshold", background.DEFAULT_THRESHOLD),
+        crop=crop, padding=job.get("crop_padding", 0), tile_rows=job["tile_rows"],
+    )
+    result = {"crop": transform.crop_record(box, size) if box else None}
+    if job.get("threshold") == background.AUTO_THRESHOLD:
+        result["threshold"] = threshold
+    return result
+
+
+def _zoom_out_tiled(job):
+    record = tiled.zoom_out_file(
+        job["input"], job["output"], job.get("scale", 0.65), job.get("fill", (248, 248, 248)),
+        tile_rows=job["tile_rows"], save=lambda img, path: save_image(img, path, job),
+    )
+    return {"jpeg": record} if record else {}
+
+
+# Used instead of OPERATIONS when a job sets "tile_rows"; these read and
+# write the files themselves and return extra result fields.
+TILED_OPERATIONS = {
+    "remove-bg": _remove_bg_tiled,
+    "zoom-out": _zoom_out_tiled,
+}
+
+
+def runs_tiled(job):
+    # Border-connected removal needs the whole image to follow regions across strips.
+    return job.get("tile_rows") and job["op"] in TILED_OPERATIONS and job.get("mode") != "border"
+
+
+def _resolve_threshold(job, img, result):
+    """Returns `job` with an "auto" remove-bg threshold replaced by the one picked for `img`."""
+    if job["op"] != "remove-bg" or job.get("threshold") != background.AUTO_THRESHOLD:
+        return job
+    result["threshold"] = background.auto_threshold(img)
+    return dict(job, threshold=result["threshold"])
+
+
+def load_titles(path):
+    """Reads a title spec and returns its titles as bake-title jobs.
+
+    Each title names a "style" from the spec's "styles" (fill, shadow and
+    so on); keys set on the title itself take precedence.
+    """
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+
+    styles = spec.get("styles", {})
+    jobs = []
+    for title in spec["titles"]:
+        title = dict(title)
+        style = title.pop("style", None)
+        if style is not None and style not in styles:
+            raise ValueError(f"Unknown title style {style!r} for {title['output']}")
+        jobs.append(dict(styles.get(style, {}), op="bake-title", **title))
+    return jobs
+
+
+def load_manifest(path):
+    """Reads a job manifest and resolves its paths against the manifest's `root`.
+
+    Returns {"root", "jobs", "asset_manifest", "titles", "atlases",
+    "placeholders", "placeholder_images", "audit"}. The titles of the spec named by
+    "titles" are added as bake-title jobs. A job's "derivatives",
+    "png_optimize" and "placeholders" blocks default to the manifest-level
+    ones and may be set to false. Its "jpeg" block, how JPEG outputs are
+    encoded, also defaults to the manifest's; a job "quality" pins it. So
+    does "threads", the thread count for work within one image.
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    manifest_dir = os.path.dirname(os.path.abspath(path))
+    root = os.path.normpath(os.path.join(manifest_dir, manifest.get("root", ".")))
+    asset_manifest = manifest.get("asset_manifest")
+    titles = os.path.join(manifest_dir, manifest["titles"]) if manifest.get("titles") else None
+    entries = list(manifest.get("jobs", []))
+    if titles:
+        entries += load_titles(titles)
+    jobs = []
+    for job in entries:
+        if job["op"] not in OPERATIONS:
+            raise ValueError(f"Unknown operation {job['op']!r} for {job['output']}")
+        job = dict(job)
+        job["input"] = os.path.normpath(os.path.join(root, job["input"]))
+        job["output"] = os.path.normpath(os.path.join(root, job["output"]))
+        if job["op"] == "bake-title":
+            job["font"] = os.path.normpath(os.path.join(root, job.get("font", DEFAULT_FONT)))
+        job["derivatives"] = derivatives.resolve_settings(job.get("derivatives", manifest.get("derivatives")), root)
+        job["png_optimize"] = pngopt.resolve_settings(job.get("png_optimize", manifest.get("png_optimize")))
+        job["placeholders"] = placeholder.resolve_settings(job.get("placeholders", manifest.get("placeholders")))
+        job["jpeg"] = jpegenc.resolve_settings(job.get("jpeg", manifest.get("jpeg")), job.get("quality"))
+        job["threads"] = job.get("threads", manifest.get("threads", parallel.DEFAULT_THREADS))
+        jobs.append(job)
+    placeholders = manifest.get("placeholders")
+    return {
+        "root": root,
+        "jobs": jobs,
+        "asset_manifest": os.path.join(root, asset_manifest) if asset_manifest else None,
+        "titles": titles,
+        "atlases": [atlas.resolve_settings(a, root, manifest.get("png_optimize")) for a in manifest.get("atlases", [])],
+        "placeholders": placeholder.resolve_settings(placeholders),
+        "placeholder_images": [os.path.normpath(os.path.join(root, p))
+                               for p in (placeholders.get("images", []) if isinstance(placeholders, dict) else [])],
+        "audit": audit.resolve_settings(manifest.get("audit"), root, manifest.get("png_optimize"), manifest.get("jpeg")),
+    }
+
+
+def save_image(img, path, job):
+    """Saves `img`; JPEGs go through jpegenc per the job's "jpeg" settings and return its record."""
+    if os.path.splitext(path)[1].lower() in (".jpg", ".jpeg"):
+        return jpegenc.save(img, path, job.get("jpeg") or jpegenc.resolve_settings(None, job.get("quality")))
+    img.save(path, "PNG")
+    return None
+
+
+# The stage each operation's own work is timed under.
+OPERATION_STAGES = {"bake-title": "draw"}
+
+# Decoded inside the operation, at draft scale when that suffices.
+DRAFTING_OPERATIONS = {"zoom-out"}
+
+
+def run_job(job, profile=False, cprofile_dir=None):
+    """Runs one job and returns a result record with its wall time.
+
+    The record times each stage in "stages" and gives the bytes read and
+    written. With `profile`, it also has the job's peak RSS; with a
+    `cprofile_dir`, a cProfile dump of the job is written there.
+    """
+    start = time.perf_counter()
+    result = {"op": job["op"], "input": job["input"], "output": job["output"], "ok": True, "error": None,
+              "extra_outputs": [], "stages": {}}
+    stages = result["stages"]
+    if profile:
+        profiling.reset_peak_rss()
+    profiler = cProfile.Profile() if cprofile_dir else None
+    if profiler:
+        profiler.enable()
+    try:
+        if runs_tiled(job):
+            with profiling.stage(stages, "tiled"):
+                result.update(TILED_OPERATIONS[job["op"]](job))
+            img = None
+            if job.get("derivatives") or job.get("placeholders"):
+                with Image.open(job["output"]) as img:
+                    img.load()
+        else:
+            with Image.open(job["input"]) as img:
+                if job["op"] not in DRAFTING_OPERATIONS:
+                    with profiling.stage(stages, "decode"):
+                        img.load()
+                job = _resolve_threshold(job, img, result)
+                with profiling.stage(stages, OPERATION_STAGES.get(job["op"], "transform")):
+                    img = OPERATIONS[job["op"]](img, job)
+            if job["op"] in AUTO_CROP_OPERATIONS and job.get("crop", True):
+                with profiling.stage(stages, "crop"):
+                    img, result["crop"] = _auto_crop(img, job)
+            with profiling.stage(stages, "encode"):
+                record = save_image(img, job["output"], job)
+            if record:
+                result["jpeg"] = record
+            # Tiled jobs skip this: optimising needs the whole image in memory.
+            if job.get("png_optimize") and job["output"].lower().endswith(".png"):
+                with profiling.stage(stages, "png-optimize"):
+                    result["png"] = pngopt.optimize_file(job["output"], job["png_optimize"])
+        if result.get("crop"):
+            result["extra_outputs"].append(_write_crop_sidecar(job["output"], result["crop"]))
+        if job.get("derivatives"):
+            with profiling.stage(stages, "derivatives"):
+                result["width"], result["height"] = img.size
+                result["variants"] = derivatives.make_derivatives(img, job["output"], job["derivatives"],
+                                                                  job.get("threads", parallel.DEFAULT_THREADS))
+            result["extra_outputs"].extend(v["path"] for v in result["variants"])
+        if job.get("placeholders"):
+            with profiling.stage(stages, "placeholders"):
+                result.update(placeholder.describe(img, job["placeholders"]))
+        result["bytes_in"] = os.path.getsize(job["input"])
+        result["bytes_out"] = sum(os.path.getsize(p) for p in [job["output"]] + result["extra_outputs"])
+    except Exception as e:
+        result["ok"] = False
+        result["error"] = str(e)
+    if profiler:
+        profiler.disable()
+        os.makedirs(cprofile_dir, exist_ok=True)
+        profiler.dump_stats(profiling.cprofile_path(cprofile_dir, job["output"]))
+    if profile:
+        result["peak_rss_mb"] = profiling.peak_rss_mb()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def dependencies(jobs):
+    """The job graph: for each job, the indices of the jobs producing its input or font.
+
+    Raises ValueError if two jobs write the same output or the jobs depend
+    on each other in a cycle.
+    """
+    producers = {}
+    for i, job in enumerate(jobs):
+        if job["output"] in producers:
+            raise ValueError(f"Two jobs write {job['output']}")
+        producers[job["output"]] = i
+    graph = [{producers[p] for p in (job["input"], job.get("font")) if p in producers} for job in jobs]
+    schedule(jobs, graph)
+    return graph
+
+
+def schedule(jobs, graph=None):
+    """Groups jobs into waves so that a job runs after the jobs producing its input."""
+    graph = dependencies(jobs) if graph is None else graph
+    levels = {}
+
+    def level(i, seen=()):
+        if i not in levels:
+            if i in seen:
+                raise ValueError(f"Dependency cycle at {jobs[i]['output']}")
+            levels[i] = max((level(d, seen + (i,)) + 1 for d in graph[i]), default=0)
+        return levels[i]
+
+    waves = {}
+    for i in range(len(jobs)):
+        waves.setdefault(level(i), []).append(jobs[i])
+    return [waves[k] for k in sorted(waves)]
@@ -0,0 +1,202 @@
+"""Progressive, optimised JPEG encoding with an optional size or quality target.
+
+Without a target a JPEG is written at a fixed quality. With "max_bytes"
+the highest quality that fits the budget is searched for; with
+"min_ssim" the lowest quality whose luma SSIM against the source stays
+above the floor. Each chroma subsampling in "subsampling" is searched
+separately, and the best result is kept: the best-looking one that fits
+a budget, or the smallest one that meets a floor.
+"""
+import contextlib
+import io
+import threading
+
+import numpy as np
+from PIL import Image, ImageFile
+
+DEFAULT_QUALITY = 85
+DEFAULT_QUALITY_RANGE = (40, 95)
+# Pillow's subsampling values: 0 is 4:4:4, 1 is 4:2:2, 2 is 4:2:0.
+DEFAULT_SUBSAMPLING = (2, 0)
+SUBSAMPLING_NAMES = {0: "4:4:4", 1: "4:2:2", 2: "4:2:0"}
+
+
+def resolve_settings(settings, quality=None):
+    """Fills in defaults for a "jpeg" block.
+
+    A job's own "quality" pins the encoding to that quality, with no
+    target search. "max_bytes" and "min_ssim" are mutually exclusive.
+    """
+    settings = dict(settings) if isinstance(settings, dict) else {}
+    if "max_bytes" in settings and "min_ssim" in settings:
+        raise ValueError('A "jpeg" block takes "max_bytes" or "min_ssim", not both')
+    if quality is not None:
+        settings.pop("max_bytes", None)
+        settings.pop("min_ssim", None)
+        settings["quality"] = quality
+    settings["quality"] = settings.get("quality", DEFAULT_QUALITY)
+    settings["quality_range"] = list(settings.get("quality_range", DEFAULT_QUALITY_RANGE))
+    subsampling = settings.get("subsampling", DEFAULT_SUBSAMPLING)
+    settings["subsampling"] = [subsampling] if isinstance(subsampling, int) else list(subsampling)
+    settings["progressive"] = settings.get("progressive", True)
+    return settings
+
+
+_SSIM_C1 = (0.01 * 255) ** 2
+_SSIM_C2 = (0.03 * 255) ** 2
+
+
+def _window_means(a):
+    """Means over 8x8 windows at a stride of 4, so windows straddle the JPEG block edges too.
+
+    Works from 4x4 block sums; with uint8-derived inputs every sum is an
+    integer below 2**24, so float32 is exact.
+    """
+    h, w = a.shape[0] // 4 * 4, a.shape[1] // 4 * 4
+    blocks = a[:h, :w].reshape(h // 4, 4, w // 4, 4).sum(axis=(1, 3))
+    return (blocks[:-1, :-1] + blocks[1:, :-1] + blocks[:-1, 1:] + blocks[1:, 1:]) / 64
+
+
+def ssim_against(reference):
+    """Returns a function scoring a luma array by its mean SSIM against `reference` (2-D uint8).
+
+    The reference's window statistics are computed once, since a search
+    scores many candidates against the same source.
+    """
+    x = reference.astype(np.float32)
+    if min(x.shape) < 8:
+        return lambda candidate: 1.0 if np.array_equal(reference, candidate) else 0.0
+    mx = _window_means(x)
+    vx = _window_means(x * x) - mx * mx
+
+    def score(candidate):
+        y = candidate.astype(np.float32)
+        my = _window_means(y)
+        vy = _window_means(y * y) - my * my
+        cov = _window_means(x * y) - mx * my
+        index = (((2 * mx * my + _SSIM_C1) * (2 * cov + _SSIM_C2))
+                 / ((mx * mx + my * my + _SSIM_C1) * (vx + vy + _SSIM_C2)))
+        return float(index.mean())
+
+    return score
+
+
+def ssim(reference, candidate):
+    """Mean structural similarity of two 2-D luma arrays, over 8x8 windows."""
+    return ssim_against(reference)(candidate)
+
+
+# Encodes in flight and the output buffer each needs; see _output_buffer.
+_buffer_lock = threading.Lock()
+_buffer_needs = []
+_base_maxblock = ImageFile.MAXBLOCK
+
+
+@contextlib.contextmanager
+def _output_buffer(size):
+    """Raises Pillow's process-wide ImageFile.MAXBLOCK to at least `size` bytes for the block.
+
+    Encodes on other threads (the image service's) may overlap, so the
+    value stays at the largest need in flight and the original comes
+    back only when the last one finishes.
+    """
+    global _base_maxblock
+    with _buffer_lock:
+        if not _buffer_needs:
+            _base_maxblock = ImageFile.MAXBLOCK
+        _buffer_needs.append(size)
+        ImageFile.MAXBLOCK = max([_base_maxblock] + _buffer_needs)
+    try:
+        yield
+    finally:
+        with _buffer_lock:
+            _buffer_needs.remove(size)
+            ImageFile.MAXBLOCK = max([_base_maxblock] + _buffer_needs)
+
+
+def _encode(img, quality, subsampling, progressive):
+    # Pillow sizes the output buffer of an optimised JPEG at one byte per
+    # pixel, which busy 4:4:4 encodes can outgrow; allow for the raw pixels.
+    buf = io.BytesIO()
+    with _output_buffer(3 * img.width * img.height):
+        img.save(buf, "JPEG", quality=quality, subsampling=subsampling, progressive=progressive, optimize=True)
+    return buf.getvalue()
+
+
+def _luma(data):
+    with Image.open(io.BytesIO(data)) as img:
+        return np.asarray(img.convert("L"))
+
+
+def _search(img, score_ssim, subsampling, settings):
+    """Binary-searches quality for one subsampling; returns (data, quality, ssim) or None."""
+    low, high = settings["quality_range"]
+    found = None
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(img, quality, subsampling, settings["progressive"])
+        if "max_bytes" in settings:
+            fits = len(data) <= settings["max_bytes"]
+        else:
+            score = score_ssim(_luma(data))
+            fits = score >= settings["min_ssim"]
+        if fits:
+            found = (data, quality, None if "max_bytes" in settings else score)
+        # Under a budget, look for a higher quality that still fits;
+        # above a floor, look for a lower one that still passes.
+        if fits == ("max_bytes" in settings):
+            low = quality + 1
+        else:
+            high = quality - 1
+    if found and found[2] is None:
+        found = (found[0], found[1], score_ssim(_luma(found[0])))
+    return found
+
+
+def encode(img, settings):
+    """Returns (jpeg_bytes, record) for `img`; the record describes the chosen settings."""
+    img = img.convert("RGB")
+    if "max_bytes" not in settings and "min_ssim" not in settings:
+        subsampling = settings["subsampling"][0]
+        data = _encode(img, settings["quality"], subsampling, settings["progressive"])
+        return data, {"quality": settings["quality"], "subsampling": SUBSAMPLING_NAMES[subsampling],
+                      "progressive": settings["progressive"], "bytes": len(data)}
+
+    score_ssim = ssim_against(np.asarray(img.convert("L")))
+    candidates = []
+    for subsampling in settings["subsampling"]:
+        found = _search(img, score_ssim, subsampling, settings)
+        if found:
+            candidates.append(found + (subsampling,))
+
+    met = bool(candidates)
+    if "max_bytes" in settings:
+        if not candidates:
+            # Nothing fits: take the smallest encoding there is.
+            quality, subsampling = settings["quality_range"][0], max(settings["subsampling"])
+            data = _encode(img, quality, subsampling, settings["progressive"])
+            candidates = [(data, quality, score_ssim(_luma(data)), subsampling)]
+        data, quality, score, subsampling = max(candidates, key=lambda c: c[2])
+    else:
+        if not candidates:
+            quality, subsampling = settings["quality_range"][1], min(settings["subsampling"])
+            data = _encode(img, quality, subsampling, settings["progressive"])
+            candidates = [(data, quality, score_ssim(_luma(data)), subsampling)]
+        data, quality, score, subsampling = min(candidates, key=lambda c: len(c[0]))
+
+    return data, {
+        "quality": quality,
+        "subsampling": SUBSAMPLING_NAMES[subsampling],
+        "progressive": settings["progressive"],
+        "bytes": len(data),
+        "ssim": round(score, 4),
+        "target_met": met,
+    }
+
+
+def save(img, path, settings):
+    """Encodes `img` per `settings`, writes it to `path` and returns the record."""
+    data, record = encode(img, settings)
+    with open(path, "wb") as f:
+        f.write(data)
+    return record
@@ -0,0 +1,74 @@
+"""Anti-aliased alpha masks: circles, rounded rectangles and radial vignettes.
+
+Circles and rounded rectangles are drawn at SUPERSAMPLE times the size
+and box-reduced, so each edge pixel gets its coverage rather than being
+all in or all out. Vignettes are a smooth radial falloff computed
+directly. Masks depend only on the shape, size and parameters, so they
+are cached: a batch of avatars of one size draws one mask.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+SHAPES = ("circle", "rounded-rect", "vignette")
+SUPERSAMPLE = 4
+# Caps the supersampled canvas; larger masks are drawn at a lower factor.
+MAX_SUPERSAMPLED_PIXELS = 64 * 1024 * 1024
+# Corner radius as a fraction of the shorter side.
+DEFAULT_RADIUS = 0.1
+# Vignette falloff, as fractions of the distance from the centre to the edge.
+DEFAULT_INNER = 0.6
+DEFAULT_OUTER = 1.0
+
+
+def _supersample(size):
+    width, height = size
+    return max(1, min(SUPERSAMPLE, math.isqrt(MAX_SUPERSAMPLED_PIXELS // max(1, width * height))))
+
+
+def _draw(size, draw_shape):
+    """Draws a shape at the supersampled size with draw_shape(draw, box, scale) and reduces it."""
+    scale = _supersample(size)
+    width, height = size[0] * scale, size[1] * scale
+    mask = Image.new("L", (width, height), 0)
+    draw_shape(ImageDraw.Draw(mask), (0, 0, width - 1, height - 1), scale)
+    return mask.reduce(scale) if scale > 1 else mask
+
+
+def circle(size):
+    """The ellipse inscribed in `size`, a circle for square sizes."""
+    return _draw(size, lambda draw, box, scale: draw.ellipse(box, fill=255))
+
+
+def rounded_rect(size, radius=DEFAULT_RADIUS):
+    """A rectangle filling `size` with corners of `radius` times the shorter side."""
+    radius = min(max(radius, 0.0), 0.5) * min(size)
+    return _draw(size, lambda draw, box, scale: draw.rounded_rectangle(box, radius * scale, fill=255))
+
+
+def vignette(size, inner=DEFAULT_INNER, outer=DEFAULT_OUTER):
+    """Opaque within `inner` of the way from the centre to the edge, fading to clear at `outer`."""
+    width, height = size
+    y = (np.arange(height, dtype=np.float32) + 0.5) / height * 2 - 1
+    x = (np.arange(width, dtype=np.float32) + 0.5) / width * 2 - 1
+    distance = np.sqrt(x[None, :] ** 2 + y[:, None] ** 2)
+    t = np.clip((outer - distance) / max(outer - inner, 1e-6), 0, 1)
+    return Image.fromarray(np.rint(t * t * (3 - 2 * t) * 255).astype(np.uint8), "L")
+
+
+@lru_cache(maxsize=64)
+def shape_mask(shape, size, radius=DEFAULT_RADIUS, inner=DEFAULT_INNER, outer=DEFAULT_OUTER):
+    """The "L" mask of `shape` at `size`, drawn once per (shape, size, parameters) per process.
+
+    The result is shared between callers and must not be modified.
+    """
+    size = tuple(size)
+    if shape == "circle":
+        return circle(size)
+    if shape == "rounded-rect":
+        return rounded_rect(size, radius)
+    if shape == "vignette":
+        return vignette(size, inner, outer)
+    raise ValueError(f"Unknown mask shape {shape!r}; expected one of {', '.join(SHAPES)}")
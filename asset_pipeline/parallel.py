@@ -0,0 +1,139 @@
+"""Row-band threading within one image, bit-identical to the single-threaded operations.
+
+A process pool only helps with many images; one huge background still
+runs on one core. Pillow's convert, resize, reduce and transpose and
+NumPy's element-wise operations release the GIL, so an image split into
+bands of rows can be processed on a thread pool. Each helper here cuts
+the work where the pixels are independent and returns exactly what the
+plain Pillow call would.
+
+Resizing is the subtle case: Pillow computes its filter weights from the
+box it is given, so resizing bands separately would drift. Instead the
+two passes Pillow makes are split the way they run: the horizontal pass
+into bands of rows, and the vertical pass, done as a horizontal pass on
+the transposed image, into bands of columns. Both use the whole-image
+box, so every output pixel gets the same weights as in Image.resize.
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+DEFAULT_THREADS = 1
+
+# Modes whose conversions and resampling work pixel by pixel; anything
+# else (palettes, 16-bit) takes the single-threaded path.
+_BANDED_MODES = {"L", "LA", "RGB", "RGBA", "RGBa", "La"}
+# Filter supports, as used by Image._get_safe_box for the reduce step.
+_FILTER_SUPPORT = {
+    Image.Resampling.BOX: 0.5,
+    Image.Resampling.BILINEAR: 1.0,
+    Image.Resampling.HAMMING: 1.0,
+    Image.Resampling.BICUBIC: 2.0,
+    Image.Resampling.LANCZOS: 3.0,
+}
+
+
+def bands(length, threads, align=1):
+    """Splits range(length) into up to `threads` (start, end) bands; inner edges fall on multiples of `align`."""
+    step = max(align, math.ceil(length / max(1, threads) / align) * align)
+    return [(start, min(start + step, length)) for start in range(0, length, step)]
+
+
+def map_bands(func, length, threads, align=1):
+    """Calls func(start, end) for each band of range(length) on `threads` threads; returns the results in order."""
+    spans = bands(length, threads, align)
+    if threads <= 1 or len(spans) == 1:
+        return [func(start, end) for start, end in spans]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(lambda span: func(*span), spans))
+
+
+def _assemble(mode, size, pieces, vertical=False):
+    output = Image.new(mode, size)
+    for offset, piece in pieces:
+        output.paste(piece, (offset, 0) if vertical else (0, offset))
+    return output
+
+
+def map_rows(func, img, threads, mode=None, width=None):
+    """Applies `func` to bands of rows of `img` and stacks the resulting images.
+
+    `func` must map an image of n rows to one of n rows, `width` wide
+    (default: the same width) in `mode` (default: the same mode).
+    """
+    img.load()
+
+    def run(y0, y1):
+        return y0, func(img.crop((0, y0, img.width, y1)))
+
+    pieces = map_bands(run, img.height, threads)
+    return _assemble(mode or img.mode, (width or img.width, img.height), pieces)
+
+
+def convert(img, mode, threads=DEFAULT_THREADS):
+    """img.convert(mode), band by band."""
+    if threads <= 1 or img.mode not in _BANDED_MODES or mode not in _BANDED_MODES or img.mode == mode:
+        return img.convert(mode)
+    return map_rows(lambda band: band.convert(mode), img, threads, mode)
+
+
+def _reduce(img, factor, box, threads):
+    """img.reduce(factor, box) for L/RGB images, in bands of output rows."""
+    factor_x, factor_y = factor
+    left, top, right, bottom = box
+    height = math.ceil((bottom - top) / factor_y)
+
+    def run(r0, r1):
+        return r0, img.reduce(factor, (left, top + r0 * factor_y, right, min(top + r1 * factor_y, bottom)))
+
+    pieces = map_bands(run, height, threads)
+    return _assemble(img.mode, (math.ceil((right - left) / factor_x), height), pieces)
+
+
+def _resample(img, size, resample, box, threads):
+    """img.resize(size, resample, box) without a reducing gap, one pass at a time."""
+    width, height = size
+    if width != img.width or box[0] or box[2] != img.width:
+        img = map_rows(lambda band: band.resize((width, band.height), resample, (box[0], 0, box[2], band.height)),
+                       img, threads, width=width)
+    if height != img.height or box[1] or box[3] != img.height:
+        def run(x0, x1):
+            column = img.crop((x0, 0, x1, img.height)).transpose(Image.Transpose.TRANSPOSE)
+            resized = column.resize((height, x1 - x0), resample, (box[1], 0, box[3], x1 - x0))
+            return x0, resized.transpose(Image.Transpose.TRANSPOSE)
+
+        img.load()
+        img = _assemble(img.mode, (width, height), map_bands(run, width, threads), vertical=True)
+    return img
+
+
+def resize(img, size, resample=Image.Resampling.LANCZOS, box=None, reducing_gap=None, threads=DEFAULT_THREADS):
+    """img.resize(size, resample, box, reducing_gap), spread over `threads` threads."""
+    size = tuple(size)
+    full = (0, 0) + img.size
+    box = full if box is None else tuple(box)
+    if (threads <= 1 or img.mode not in _BANDED_MODES or resample not in _FILTER_SUPPORT
+            or (size == img.size and box == full) or img.height > img.width * 100):
+        return img.resize(size, resample, box, reducing_gap)
+
+    # The steps of Image.resize: premultiplied alpha (with no reducing
+    # gap), then an integer reduce, then the resampling passes.
+    if img.mode in ("LA", "RGBA"):
+        premultiplied = {"LA": "La", "RGBA": "RGBa"}[img.mode]
+        resized = _resample(convert(img, premultiplied, threads), size, resample, box, threads)
+        return convert(resized, img.mode, threads)
+
+    img.load()
+    if reducing_gap is not None:
+        factor_x = int((box[2] - box[0]) / size[0] / reducing_gap) or 1
+        factor_y = int((box[3] - box[1]) / size[1] / reducing_gap) or 1
+        if factor_x > 1 or factor_y > 1:
+            support_x = (_FILTER_SUPPORT[resample] - 0.5) * (box[2] - box[0]) / size[0]
+            support_y = (_FILTER_SUPPORT[resample] - 0.5) * (box[3] - box[1]) / size[1]
+            reduce_box = (max(0, int(box[0] - support_x)), max(0, int(box[1] - support_y)),
+                          min(img.width, math.ceil(box[2] + support_x)), min(img.height, math.ceil(box[3] + support_y)))
+            img = _reduce(img, (factor_x, factor_y), reduce_box, threads)
+            box = ((box[0] - reduce_box[0]) / factor_x, (box[1] - reduce_box[1]) / factor_y,
+                   (box[2] - reduce_box[0]) / factor_x, (box[3] - reduce_box[1]) / factor_y)
+    return _resample(img, size, resample, box, threads)
@@ -0,0 +1,98 @@
+"""Tiny placeholders and dominant colours for the asset manifest.
+
+The page can paint an asset's dominant colour, or its placeholder scaled
+up with a CSS blur, while the full image downloads. Both are computed
+from an image the pipeline already has decoded; for JPEG files that are
+only opened for this, the decoder's draft mode keeps it cheap.
+"""
+import base64
+import io
+import json
+import os
+
+import numpy as np
+from PIL import Image, features
+
+from . import transform
+
+DEFAULT_SIZE = 16
+_COLOR_SAMPLE_SIZE = 64
+_COLOR_BUCKETS = 8
+
+
+def resolve_settings(settings):
+    """Fills in defaults for a manifest "placeholders" block; returns None when disabled.
+
+    The block's "images" (static files no job produces) are handled by
+    static_results and left out here.
+    """
+    if not settings:
+        return None
+    settings = {} if settings is True else settings
+    return {"size": settings.get("size", DEFAULT_SIZE)}
+
+
+def _shrink(img, size):
+    """`img` scaled down to fit `size` x `size`, decoding JPEGs at draft scale when possible."""
+    width, height = img.size
+    scale = min(1, size / max(width, height))
+    target = (max(1, round(width * scale)), max(1, round(height * scale)))
+    box = transform.draft(img, target)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+    return img.resize(target, Image.Resampling.BOX, box=box, reducing_gap=2.0)
+
+
+def data_uri(img):
+    """Encodes a (tiny) image as a data: URI, as WebP when Pillow supports it."""
+    buffer = io.BytesIO()
+    if features.check("webp"):
+        img.save(buffer, "WEBP", quality=50)
+        mime = "image/webp"
+    else:
+        img.save(buffer, "PNG", optimize=True)
+        mime = "image/png"
+    return f"data:{mime};base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+
+
+def dominant_color(img):
+    """The most common colour among the (mostly) opaque pixels of `img`, as "#rrggbb", or None."""
+    pixels = np.asarray(img.convert("RGBA"))
+    opaque = pixels[pixels[..., 3] >= 128][:, :3]
+    if not len(opaque):
+        return None
+    quantized = Image.fromarray(opaque.reshape(1, -1, 3)).quantize(_COLOR_BUCKETS)
+    count, index = max(quantized.getcolors())
+    r, g, b = quantized.getpalette()[3 * index:3 * index + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def describe(img, settings):
+    """Returns {"placeholder", "color"} for `img`, sized per `settings`."""
+    small = _shrink(img, max(settings["size"], _COLOR_SAMPLE_SIZE))
+    tiny = small.copy()
+    tiny.thumbnail((settings["size"], settings["size"]), Image.Resampling.BOX)
+    return {"placeholder": data_uri(tiny), "color": dominant_color(small)}
+
+
+def static_results(paths, settings, asset_manifest, root):
+    """Job-result-like records for the images in `paths` whose placeholder is missing or out of date.
+
+    These are files that no job produces (backgrounds shipped as is), so
+    they are opened here; an entry is current if the asset manifest was
+    written after the image last changed.
+    """
+    entries, built = {}, 0
+    if asset_manifest and os.path.exists(asset_manifest):
+        with open(asset_manifest, encoding="utf-8") as f:
+            entries = json.load(f)
+        built = os.path.getmtime(asset_manifest)
+
+    results = []
+    for path in paths:
+        key = os.path.relpath(path, root).replace(os.sep, "/")
+        if "placeholder" in entries.get(key, {}) and os.path.getmtime(path) <= built:
+            continue
+        with Image.open(path) as img:
+            results.append(dict(describe(img, settings), output=path, ok=True))
+    return results
@@ -0,0 +1,100 @@
+"""Per-stage timings, bytes in and out and peak memory of jobs, and reports of them.
+
+run_job always times its stages (decode, transform or draw, crop, encode
+and the optional png-optimize, derivatives and placeholders steps). When
+profiling, it also measures the job's own peak RSS and can keep a
+cProfile dump per job; write_report writes the results as JSON or CSV.
+"""
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ("decode", "transform", "draw", "tiled", "crop", "encode", "png-optimize", "derivatives", "placeholders")
+
+_REPORT_FIELDS = ("output", "op", "status", "seconds", "bytes_in", "bytes_out", "peak_rss_mb")
+
+
+@contextlib.contextmanager
+def stage(stages, name):
+    """Adds the time spent in the block to `stages[name]`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def peak_rss_mb():
+    """The process's peak resident set size in MB, or None where it can't be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def reset_peak_rss():
+    """Resets the peak RSS to the current RSS; returns False where the OS doesn't allow it.
+
+    Only Linux does, through /proc. Elsewhere the peak stays the process's
+    high-water mark, so a job's figure may be that of an earlier, larger one.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def cprofile_path(directory, output):
+    return os.path.join(directory, os.path.basename(output) + ".prof")
+
+
+def report_rows(results, root):
+    """One flat record per job result, with a column per stage."""
+    rows = []
+    for result in results:
+        status = result.get("cached") or ("skipped" if result.get("skipped") else "ok" if result["ok"] else "failed")
+        row = {
+            "output": os.path.relpath(result["output"], root).replace(os.sep, "/"),
+            "op": result["op"],
+            "status": status,
+            "seconds": round(result["seconds"], 4),
+            "bytes_in": result.get("bytes_in"),
+            "bytes_out": result.get("bytes_out"),
+            "peak_rss_mb": round(result["peak_rss_mb"], 1) if result.get("peak_rss_mb") is not None else None,
+        }
+        for name in STAGES:
+            row[name] = round(result.get("stages", {}).get(name, 0.0), 4)
+        rows.append(row)
+    return rows
+
+
+def write_report(path, results, root):
+    """Writes the job results' metrics to `path`, as CSV if it ends in .csv and JSON otherwise."""
+    rows = report_rows(results, root)
+    if path.lower().endswith(".csv"):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=_REPORT_FIELDS + STAGES)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"stages": list(STAGES), "jobs": rows}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+    return rows
+
+
+def stage_totals(rows):
+    """Total seconds per stage over all rows, largest first, leaving out unused stages."""
+    totals = {name: sum(row[name] for row in rows) for name in STAGES}
+    return sorted(((name, t) for name, t in totals.items() if t), key=lambda item: item[1], reverse=True)
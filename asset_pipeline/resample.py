@@ -0,0 +1,107 @@
+"""Vertical Lanczos resampling that can be applied one band of rows at a time.
+
+Pillow's resize() computes its filter weights from the box it is given,
+so resizing bands separately drifts by +-1 from a whole-image resize.
+This module precomputes the weights for the whole output height exactly
+as Pillow's Resample.c does (same double arithmetic, same 22-bit fixed
+point), so any band of output rows can be produced from just the input
+rows it needs and still match Image.resize bit for bit. The horizontal
+pass is left to Pillow: it is per-row and splits cleanly already.
+nearest_indices does the same for nearest-neighbour sampling.
+"""
+import math
+
+import numpy as np
+from PIL import Image
+
+PRECISION_BITS = 32 - 8 - 2
+LANCZOS_SUPPORT = 3.0
+
+
+def _sinc(x):
+    if x == 0.0:
+        return 1.0
+    x = x * math.pi
+    return math.sin(x) / x
+
+
+def _lanczos(x):
+    if -3.0 <= x < 3.0:
+        return _sinc(x) * _sinc(x / 3)
+    return 0.0
+
+
+def _sum_in_order(values):
+    # Left-to-right like the C loop; newer Pythons' sum() compensates rounding.
+    total = 0.0
+    for v in values:
+        total += v
+    return total
+
+
+def nearest_indices(in_size, out_size):
+    """The input index Pillow's NEAREST resize picks for each of `out_size` outputs, as an array."""
+    # Asked of Pillow itself: its affine stepping can round differently from (i + 0.5) * scale.
+    ramp = Image.fromarray(np.arange(in_size, dtype=np.int32)[None, :])
+    return np.asarray(ramp.resize((out_size, 1), Image.Resampling.NEAREST))[0]
+
+
+class LanczosCoefficients:
+    """Fixed-point Lanczos weights for resampling `in_size` rows to `out_size` rows."""
+
+    def __init__(self, in_size, out_size):
+        scale = filterscale = in_size / out_size
+        if filterscale < 1.0:
+            filterscale = 1.0
+        support = LANCZOS_SUPPORT * filterscale
+        ksize = int(math.ceil(support)) * 2 + 1
+
+        self.in_size = in_size
+        self.out_size = out_size
+        self.starts = np.zeros(out_size, dtype=np.int64)
+        self.counts = np.zeros(out_size, dtype=np.int64)
+        self.weights = np.zeros((out_size, ksize), dtype=np.int32)
+
+        ss = 1.0 / filterscale
+        for xx in range(out_size):
+            center = (xx + 0.5) * scale
+            xmin = max(int(center - support + 0.5), 0)
+            xmax = min(int(center + support + 0.5), in_size) - xmin
+            k = [_lanczos((x + xmin - center + 0.5) * ss) for x in range(xmax)]
+            ww = _sum_in_order(k)
+            for x, w in enumerate(k):
+                if ww != 0.0:
+                    w /= ww
+                if w < 0:
+                    self.weights[xx, x] = int(-0.5 + w * (1 << PRECISION_BITS))
+                else:
+                    self.weights[xx, x] = int(0.5 + w * (1 << PRECISION_BITS))
+            self.starts[xx] = xmin
+            self.counts[xx] = xmax
+
+    def input_rows(self, out_top, out_bottom):
+        """Returns the [first, last) input rows needed for output rows [out_top, out_bottom)."""
+        first = int(self.starts[out_top])
+        last = int((self.starts[out_top:out_bottom] + self.counts[out_top:out_bottom]).max())
+        return first, last
+
+    def apply(self, rows, rows_top, out_top, out_bottom):
+        """Resamples output rows [out_top, out_bottom) from `rows`, a uint8 array of input rows.
+
+        `rows[0]` is input row `rows_top`; it must cover input_rows(out_top, out_bottom).
+        """
+        starts = self.starts[out_top:out_bottom] - rows_top
+        weights = self.weights[out_top:out_bottom]
+        last_row = rows.shape[0] - 1
+        shape = (out_bottom - out_top,) + (1,) * (rows.ndim - 1)
+
+        # The sums fit in 32 bits, as in the C code.
+        acc = np.full((out_bottom - out_top,) + rows.shape[1:], 1 << (PRECISION_BITS - 1), dtype=np.int32)
+        for tap in range(weights.shape[1]):
+            w = weights[:, tap]
+            if not w.any():
+                continue
+            index = np.minimum(starts + tap, last_row)
+            acc += rows[index] * w.reshape(shape)
+        np.right_shift(acc, PRECISION_BITS, out=acc)
+        return np.clip(acc, 0, 255).astype(np.uint8)
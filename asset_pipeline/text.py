@@ -0,0 +1,113 @@
+"""Title baking onto background images.
+
+Fonts are loaded once per (path, size) per process, and the rasterised
+title masks are cached, so baking the same title onto many backgrounds
+costs one mask fill per layer instead of a font parse, a text
+measurement and a glyph render each time. The fills are the same
+operation ImageDraw.text performs, so the output is unchanged.
+"""
+import math
+import os
+import unicodedata
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Transparent margin around cached masks, for glyphs that spill past their bbox.
+_MASK_PADDING = 2
+
+
+@lru_cache(maxsize=32)
+def load_font(font_path, font_size):
+    """Returns a FreeType font, parsing each (path, size) only once per process."""
+    return ImageFont.truetype(font_path, font_size)
+
+
+@lru_cache(maxsize=256)
+def measure_title(text, font_path, font_size):
+    """Returns the (width, height) of `text`'s ink box, as draw.textbbox would."""
+    left, top, right, bottom = load_font(font_path, font_size).getbbox(text)
+    return right - left, bottom - top
+
+
+@lru_cache(maxsize=256)
+def missing_glyphs(text, font_path, font_size):
+    """The characters of `text` the font draws nothing for, such as ones left out of a subset.
+
+    Whitespace and other characters without ink of their own are skipped.
+    """
+    font = load_font(font_path, font_size)
+    missing = (ch for ch in text
+               if unicodedata.category(ch)[0] not in "CZ" and font.getmask(ch).getbbox() is None)
+    return "".join(dict.fromkeys(missing))
+
+
+@lru_cache(maxsize=256)
+def _text_mask(text, font_path, font_size, start):
+    """Renders `text` into an "L" mask; returns (mask, dx, dy) relative to the draw position.
+
+    `start` is the fractional part of the draw position, which FreeType
+    uses for sub-pixel placement.
+    """
+    font = load_font(font_path, font_size)
+    left, top, right, bottom = font.getbbox(text)
+    origin_x = _MASK_PADDING - left
+    origin_y = _MASK_PADDING - top
+    mask = Image.new("L", (right - left + 2 * _MASK_PADDING, bottom - top + 2 * _MASK_PADDING), 0)
+    ImageDraw.Draw(mask).text((origin_x + start[0], origin_y + start[1]), text, font=font, fill=255)
+    return mask, -origin_x, -origin_y
+
+
+@lru_cache(maxsize=64)
+def render_title(text, font_path, font_size, fill, shadow_fill=None, shadow_offset=0, start=(0.0, 0.0)):
+    """Returns the layers of a title, shadow first, as (dx, dy, mask, color) tuples."""
+    mask, dx, dy = _text_mask(text, font_path, font_size, start)
+    layers = []
+    if shadow_fill is not None and shadow_offset:
+        layers.append((dx + shadow_offset, dy + shadow_offset, mask, shadow_fill))
+    layers.append((dx, dy, mask, fill))
+    return tuple(layers)
+
+
+def draw_title(img, xy, text, font_path, font_size, fill, shadow_fill=None, shadow_offset=0):
+    """Draws `text` at `xy` on `img` in place, with an optional drop shadow offset by whole pixels."""
+    x, y = xy
+    start = (math.modf(x)[0], math.modf(y)[0])
+    layers = render_title(
+        text, font_path, font_size, tuple(fill),
+        tuple(shadow_fill) if shadow_fill is not None else None, int(shadow_offset), start,
+    )
+    for dx, dy, mask, color in layers:
+        img.paste(color, (int(x) + dx, int(y) + dy), mask)
+    return img
+
+
+def resolve_font_size(size, font_size=None, font_size_ratio=None, relative_to="height"):
+    """Returns an absolute font size, either fixed or as a ratio of the image width/height."""
+    if font_size is not None:
+        return int(font_size)
+    width, height = size
+    return int((width if relative_to == "width" else height) * font_size_ratio)
+
+
+def bake_title(img, text, font_path, font_size, y_ratio, anchor="top",
+               fill=(40, 20, 10), shadow_fill=None, shadow_offset=0):
+    """Draws `text` horizontally centred on `img`, with an optional drop shadow.
+
+    `y_ratio` is the vertical position as a fraction of the image height;
+    with anchor="middle" it is the centre of the text, otherwise its top.
+    Raises ValueError if the font lacks a glyph, rather than baking a gap.
+    """
+    missing = missing_glyphs(text, font_path, font_size)
+    if missing:
+        raise ValueError(f"{os.path.basename(font_path)} has no glyphs for {missing!r}; "
+                         f"if it is a subset, rerun `python -m asset_pipeline subset-font`")
+    img = img.convert("RGB")
+    text_width, text_height = measure_title(text, font_path, font_size)
+
+    x = (img.width - text_width) / 2
+    y = img.height * y_ratio
+    if anchor == "middle":
+        y -= text_height / 2
+
+    return draw_title(img, (x, y), text, font_path, font_size, fill, shadow_fill, shadow_offset)
@@ -0,0 +1,326 @@
+"""Strip-by-strip variants of the operations, for very large source images.
+
+The in-memory operations decode and convert the whole image and build
+full-size masks and output canvases. Here those intermediates are
+limited to one strip of `tile_rows` rows. 8-bit, non-interlaced PNG
+sources are decoded a strip at a time too (see PngStripReader), and read
+again for each pass an operation makes over them; Pillow can't decode
+part of other files, so those are decoded whole, once, in their own
+mode. PNG output is encoded as the strips are produced, so it is never
+held at full size; JPEG output is assembled in one output-sized image
+because Pillow can only encode a JPEG from a complete image, and a size
+or SSIM target search (see jpegenc) holds further encoded and decoded
+copies of it.
+"""
+import contextlib
+import io
+import struct
+import zlib
+
+import numpy as np
+from PIL import Image
+
+from . import background, resample, transform
+
+DEFAULT_TILE_ROWS = 256
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_PNG_COLOR_TYPES = {"L": (0, 1), "RGB": (2, 3), "RGBA": (6, 4)}
+# Bytes per pixel of each 8-bit PNG colour type (grey, RGB, palette, grey + alpha, RGBA).
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+_READ_SIZE = 1 << 20
+
+
+def _png_chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(data, zlib.crc32(tag)))
+
+
+class PngStripWriter:
+    """Writes a PNG one band of rows at a time, using the Sub filter on every row."""
+
+    def __init__(self, path, width, height, mode="RGBA", compress_level=6):
+        self.color_type, self.bpp = _PNG_COLOR_TYPES[mode]
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.file = open(path, "wb")
+        self.compressor = zlib.compressobj(compress_level)
+        self.file.write(_PNG_SIGNATURE)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, self.color_type, 0, 0, 0))
+
+    def _chunk(self, tag, data):
+        self.file.write(_png_chunk(tag, data))
+
+    def write(self, rows):
+        """Appends an (n, width, channels) uint8 array of rows."""
+        n = rows.shape[0]
+        flat = rows.reshape(n, self.width * self.bpp)
+        filtered = np.empty((n, flat.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 1
+        filtered[:, 1:self.bpp + 1] = flat[:, :self.bpp]
+        np.subtract(flat[:, self.bpp:], flat[:, :-self.bpp], out=filtered[:, self.bpp + 1:])
+        data = self.compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b"IDAT", data)
+        self.rows_written += n
+
+    def close(self):
+        if self.rows_written != self.height:
+            self.file.close()
+            raise ValueError(f"Wrote {self.rows_written} of {self.height} rows")
+        self._chunk(b"IDAT", self.compressor.flush())
+        self._chunk(b"IEND", b"")
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+
+class PngStripReader:
+    """Reads an 8-bit, non-interlaced PNG one band of rows at a time; raises ValueError for other files.
+
+    The image data is inflated only as far as each band needs. Pillow then
+    decodes the band from a small PNG of the source's header chunks and
+    the band's filtered rows, preceded by the unfiltered row above it
+    (zeros for the first band), which the band's first row is filtered
+    against. So each band has the mode, palette and transparency Pillow
+    gives the whole file.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self._read_header()
+        except Exception:
+            self.file.close()
+            raise
+
+    def _read_chunk_header(self):
+        header = self.file.read(8)
+        if len(header) < 8:
+            raise ValueError("Truncated PNG file")
+        return struct.unpack(">I4s", header)
+
+    def _read_header(self):
+        if self.file.read(8) != _PNG_SIGNATURE:
+            raise ValueError("Not a PNG file")
+        self.chunks = []
+        while True:
+            length, tag = self._read_chunk_header()
+            if (tag == b"IHDR") == bool(self.chunks) or tag == b"IEND":
+                raise ValueError("Malformed PNG file")
+            if tag == b"IDAT":
+                break
+            data = self.file.read(length)
+            self.file.read(4)
+            if tag == b"IHDR":
+                self.width, self.height, depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", data)
+                if depth != 8 or interlace or color_type not in _PNG_CHANNELS:
+                    raise ValueError("Only 8-bit, non-interlaced PNGs can be read in strips")
+                self.stride = self.width * _PNG_CHANNELS[color_type]
+            if tag in (b"IHDR", b"PLTE", b"tRNS"):
+                self.chunks.append((tag, data))
+        self.idat_left = length
+        self.inflater = zlib.decompressobj()
+        self.pending = bytearray()
+        self.previous = bytes(self.stride)
+
+    def _compressed(self):
+        """The next piece of the image data, across IDAT chunks."""
+        while not self.idat_left:
+            self.file.read(4)
+            self.idat_left, tag = self._read_chunk_header()
+            if tag != b"IDAT":
+                raise ValueError("Truncated PNG image data")
+        data = self.file.read(min(self.idat_left, _READ_SIZE))
+        if not data:
+            raise ValueError("Truncated PNG file")
+        self.idat_left -= len(data)
+        return data
+
+    def _filtered_rows(self, count):
+        size = count * (self.stride + 1)
+        while len(self.pending) < size:
+            data = self.inflater.unconsumed_tail or self._compressed()
+            self.pending += self.inflater.decompress(data, size - len(self.pending))
+        rows = bytes(self.pending[:size])
+        del self.pending[:size]
+        return rows
+
+    def bands(self, tile_rows=DEFAULT_TILE_ROWS):
+        """Yields (top, image) for each band of `tile_rows` rows, top to bottom."""
+        for y0, y1 in _bands(self.height, tile_rows):
+            (_, ihdr), *others = self.chunks
+            png = [_PNG_SIGNATURE, _png_chunk(b"IHDR", struct.pack(">II", self.width, y1 - y0 + 1) + ihdr[8:])]
+            png += [_png_chunk(tag, data) for tag, data in others]
+            rows = b"\0" + self.previous + self._filtered_rows(y1 - y0)
+            png += [_png_chunk(b"IDAT", zlib.compress(rows, 0)), _png_chunk(b"IEND", b"")]
+            with Image.open(io.BytesIO(b"".join(png))) as band:
+                band.load()
+            band = band.crop((0, 1, self.width, band.height))
+            self.previous = band.crop((0, band.height - 1, self.width, band.height)).tobytes()
+            yield y0, band
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _bands(height, tile_rows):
+    for top in range(0, height, tile_rows):
+        yield top, min(top + tile_rows, height)
+
+
+def source_bands(path, tile_rows=DEFAULT_TILE_ROWS):
+    """Yields (top, image) for each band of `tile_rows` rows of the image at `path`, top to bottom.
+
+    PNGs PngStripReader can read are decoded band by band; other files are
+    decoded whole and cropped.
+    """
+    try:
+        reader = PngStripReader(path)
+    except ValueError:
+        reader = None
+    if reader:
+        with reader:
+            yield from reader.bands(tile_rows)
+        return
+    with Image.open(path) as img:
+        img.load()
+        for y0, y1 in _bands(img.height, tile_rows):
+            yield y0, img.crop((0, y0, img.width, y1))
+
+
+def auto_threshold(path, size, tile_rows=DEFAULT_TILE_ROWS):
+    """background.auto_threshold for the image at `path`, sampling it band by band."""
+    sample_width, sample_height = background.auto_sample_size(size)
+    rows = resample.nearest_indices(size[1], sample_height)
+    cols = resample.nearest_indices(size[0], sample_width)
+    sample = []
+    for y0, band in source_bands(path, tile_rows):
+        for y in rows[(rows >= y0) & (rows < y0 + band.height)]:
+            row = band.crop((0, y - y0, band.width, y - y0 + 1)).convert(background.sample_mode(band.mode))
+            sample.append(np.asarray(row)[0, cols])
+    return background.threshold_from_sample(np.stack(sample))
+
+
+def content_box(path, threshold, tile_rows=DEFAULT_TILE_ROWS):
+    """Bounding box of the pixels of the image at `path` that survive background removal, found strip by strip."""
+    left, top, right, bottom = None, None, 0, None
+    for y0, band in source_bands(path, tile_rows):
+        if left is None:
+            left = band.width
+        pixels = np.array(band.convert("RGBA"))
+        background.clear_white_pixels(pixels, threshold)
+        opaque = pixels[..., 3] > 0
+        rows = np.flatnonzero(opaque.any(axis=1))
+        if rows.size == 0:
+            continue
+        cols = np.flatnonzero(opaque.any(axis=0))
+        left, right = min(left, cols[0]), max(right, cols[-1] + 1)
+        if top is None:
+            top = y0 + rows[0]
+        bottom = y0 + rows[-1] + 1
+    if top is None:
+        return None
+    return int(left), int(top), int(right), int(bottom)
+
+
+def _image_size(path):
+    with Image.open(path) as img:
+        return img.size
+
+
+def remove_white_background_file(input_path, output_path, threshold=background.DEFAULT_THRESHOLD,
+                                 crop=False, padding=0, tile_rows=DEFAULT_TILE_ROWS):
+    """Tiled equivalent of background.remove_white_background, streamed to a PNG file.
+
+    With `crop`, only the content box grown by `padding` is written; a
+    source with no content is written whole, as in memory. `threshold` may
+    be background.AUTO_THRESHOLD. Returns (crop box, or None when nothing
+    was cropped, source size, threshold used).
+    """
+    size = _image_size(input_path)
+    if threshold == background.AUTO_THRESHOLD:
+        threshold = auto_threshold(input_path, size, tile_rows)
+    cropped = None
+    if crop:
+        content = content_box(input_path, threshold, tile_rows)
+        if content:
+            cropped = transform.pad_box(content, padding, size)
+    left, top, right, bottom = cropped or (0, 0) + size
+
+    with PngStripWriter(output_path, right - left, bottom - top, "RGBA") as writer:
+        for y0, band in source_bands(input_path, tile_rows):
+            y1 = y0 + band.height
+            if y1 <= top or y0 >= bottom:
+                continue
+            band = band.crop((left, max(top, y0) - y0, right, min(bottom, y1) - y0))
+            pixels = np.array(band.convert("RGBA"))
+            background.clear_white_pixels(pixels, threshold)
+            writer.write(pixels)
+    return cropped, size, threshold
+
+
+def _zoom_out_bands(path, size, scale, fill, tile_rows):
+    """Yields (top, rows) pairs of the zoom-out result, one band of output rows at a time.
+
+    The shrunken image is resized from just the source rows the Lanczos
+    kernel reads for each band, so the result matches transform.zoom_out.
+    Those rows are kept in a window that moves down the source as it is read.
+    """
+    width, height = size
+    left, top, right, bottom = transform.zoom_out_box(size, scale)
+    vertical = resample.LanczosCoefficients(height, bottom - top)
+    window, window_top = np.empty((0, width, 3), np.uint8), 0
+
+    with contextlib.closing(source_bands(path, tile_rows)) as source:
+        for y0, y1 in _bands(height, tile_rows):
+            band = np.empty((y1 - y0, width, 3), np.uint8)
+            band[:] = fill
+            r0, r1 = max(y0, top) - top, min(y1, bottom) - top
+            if r0 < r1:
+                c0, c1 = vertical.input_rows(r0, r1)
+                window, window_top = window[c0 - window_top:], c0
+                while window_top + len(window) < c1:
+                    _, rows = next(source)
+                    window = np.concatenate([window, np.asarray(rows.convert("RGB"))])
+                # Horizontal pass only; the vertical pass uses the whole-image weights.
+                strip = Image.fromarray(window[:c1 - c0]).resize((right - left, c1 - c0), Image.Resampling.LANCZOS)
+                band[top + r0 - y0:top + r1 - y0, left:right] = vertical.apply(np.asarray(strip), c0, r0, r1)
+            yield y0, band
+
+
+def zoom_out_file(input_path, output_path, scale=0.65, fill=(248, 248, 248),
+                  tile_rows=DEFAULT_TILE_ROWS, save=None):
+    """Tiled equivalent of transform.zoom_out, written to `output_path`.
+
+    The source is always decoded at full resolution, so for JPEGs at scale
+    0.5 or below (which transform.zoom_out drafts) the output may differ
+    slightly. Non-PNG output is assembled in memory and written with
+    `save(img, path)` when given. Returns what `save` returns.
+    """
+    size = _image_size(input_path)
+    if output_path.lower().endswith(".png"):
+        with PngStripWriter(output_path, *size, "RGB") as writer:
+            for _, band in _zoom_out_bands(input_path, size, scale, fill, tile_rows):
+                writer.write(band)
+        return
+
+    output = Image.new("RGB", size)
+    for y0, band in _zoom_out_bands(input_path, size, scale, fill, tile_rows):
+        output.paste(Image.fromarray(band), (0, y0))
+    if save:
+        return save(output, output_path)
+    output.save(output_path)
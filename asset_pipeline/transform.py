@@ -0,0 +1,125 @@
+"""Geometric operations: cropping, zoom-out and shape masks."""
+from PIL import Image, ImageChops
+
+from . import masks, parallel
+
+
+def pad_box(box, padding, size):
+    """Grows `box` by `padding` pixels on every side, clamped to an image of `size`."""
+    left, top, right, bottom = box
+    width, height = size
+    return (max(left - padding, 0), max(top - padding, 0),
+            min(right + padding, width), min(bottom + padding, height))
+
+
+def content_box(img, padding=0):
+    """Bounding box of the non-transparent pixels plus `padding`, or None if there are none."""
+    box = img.getbbox()
+    return pad_box(box, padding, img.size) if box else None
+
+
+def crop_to_content(img, box=None, padding=0):
+    """Crops `img` to `box`, or to the bounding box of its non-transparent pixels."""
+    if box is None:
+        box = content_box(img, padding)
+    if box:
+        img = img.crop(tuple(box))
+    return img
+
+
+def crop_record(box, source_size):
+    """Describes a crop so the layout can place the cropped image where the original sat."""
+    left, top, right, bottom = box
+    return {
+        "source_width": source_size[0],
+        "source_height": source_size[1],
+        "left": left,
+        "top": top,
+        "width": right - left,
+        "height": bottom - top,
+    }
+
+
+def draft(img, size):
+    """Lets a not-yet-loaded JPEG decode at 1/2, 1/4 or 1/8 scale if that still covers `size`.
+
+    Returns the box of the decoded image that corresponds to the original
+    frame (for Image.resize), or None when the decode is unchanged.
+    """
+    if getattr(img, "tile", None) and img.format == "JPEG":
+        drafted = img.draft(None, tuple(size))
+        if drafted and drafted[1][2:] != img.size:
+            return drafted[1]
+    return None
+
+
+def zoom_out_box(size, scale):
+    """Where zoom_out places the shrunken image: (left, top, right, bottom) within `size`."""
+    width, height = size
+    new_width = max(1, round(width * scale))
+    new_height = max(1, round(height * scale))
+    left = (width - new_width) // 2
+    top = (height - new_height) // 2
+    return left, top, left + new_width, top + new_height
+
+
+def zoom_out(img, scale=0.65, fill=(248, 248, 248), threads=parallel.DEFAULT_THREADS):
+    """Shrinks `img` to `scale` of its size, centred on a `fill` canvas of the original size.
+
+    Simulates a zoom-out: the original occupies `scale` of the new height.
+    The image is resized once and pasted, so no oversized canvas is built,
+    and JPEG sources at scale 0.5 or below are decoded at reduced size.
+    `threads` spreads the conversion and resize over bands of the image.
+    """
+    size = img.size
+    left, top, right, bottom = zoom_out_box(size, scale)
+    box = draft(img, (right - left, bottom - top))
+    shrunk = parallel.resize(parallel.convert(img, "RGB", threads), (right - left, bottom - top),
+                             Image.Resampling.LANCZOS, box=box, threads=threads)
+
+    output = Image.new("RGB", size, tuple(fill))
+    output.paste(shrunk, (left, top))
+    return output
+
+
+def centred_box(size, aspect=1.0):
+    """The centred box of `aspect` (width / height) that ImageOps.fit crops an image of `size` to."""
+    width, height = size
+    if width / height == aspect:
+        crop_width, crop_height = width, height
+    elif width / height > aspect:
+        crop_width, crop_height = aspect * height, height
+    else:
+        crop_width, crop_height = width, width / aspect
+    left, top = (width - crop_width) * 0.5, (height - crop_height) * 0.5
+    return left, top, left + crop_width, top + crop_height
+
+
+def fit_mask(img, shape, size=None, fill=None, threads=parallel.DEFAULT_THREADS, **params):
+    """Fits `img` to `size` and masks it with an anti-aliased `shape` from the masks module.
+
+    The image is cropped to the centre at the size's aspect ratio and
+    resampled straight to `size` (default: the largest centred square for
+    circles, the image's own size otherwise), so the mask is applied once,
+    at output resolution. Existing transparency is kept. With a `fill`
+    colour the result is flattened onto it, for outputs without alpha.
+    """
+    img = parallel.convert(img, "RGBA", threads)
+    if size is None:
+        size = (min(img.size),) * 2 if shape == "circle" else img.size
+    size = tuple(size)
+    output = parallel.resize(img, size, Image.Resampling.BICUBIC, centred_box(img.size, size[0] / size[1]),
+                             threads=threads)
+    output.putalpha(ImageChops.multiply(output.getchannel("A"), masks.shape_mask(shape, size, **params)))
+    if fill is None:
+        return output
+    flat = Image.new("RGB", size, tuple(fill))
+    flat.paste(output, mask=output)
+    return flat
+
+
+def make_circular(img, size=None, threads=parallel.DEFAULT_THREADS):
+    """Fits `img` to a centred square (by default the largest) and masks it with an inscribed circle."""
+    if size is not None:
+        size = (size, size)
+    return fit_mask(img, "circle", size, threads=threads)
@@ -0,0 +1,100 @@
+"""Watch mode: rerun the jobs whose source images or fonts change.
+
+Polls the modification time and size of each job's source files (rather
+than whole directories, so the outputs written next to them don't
+retrigger anything). Bursts of changes, like an editor's save-and-rename,
+are debounced into a single batch. Editing the manifest or title spec
+reloads it and reruns whatever the build cache no longer covers.
+"""
+import os
+import time
+
+from . import jobs as jobs_module
+
+DEFAULT_INTERVAL = 0.1
+DEFAULT_DEBOUNCE = 0.25
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def snapshot(paths):
+    return {path: _stat(path) for path in paths}
+
+
+def source_paths(jobs):
+    """The inputs and fonts of `jobs`, leaving out files that another job produces."""
+    outputs = {job["output"] for job in jobs}
+    paths = set()
+    for job in jobs:
+        paths.update(p for p in (job["input"], job.get("font")) if p and p not in outputs)
+    return paths
+
+
+def affected_jobs(jobs, changed):
+    """Jobs reading any of the `changed` paths, plus the jobs downstream of them, in schedule order."""
+    changed = set(changed)
+    affected = []
+    for wave in jobs_module.schedule(jobs):
+        for job in wave:
+            if job["input"] in changed or job.get("font") in changed:
+                affected.append(job)
+                changed.add(job["output"])
+    return affected
+
+
+def _config_files(manifest_path, manifest):
+    return [path for path in (os.path.abspath(manifest_path), manifest["titles"]) if path]
+
+
+def watch(manifest_path, run_batch, interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE):
+    """Calls `run_batch(manifest, jobs)` for the jobs affected by each settled burst of changes.
+
+    Runs until interrupted; `manifest` is the loaded manifest.
+    """
+    manifest = jobs_module.load_manifest(manifest_path)
+    config = snapshot(_config_files(manifest_path, manifest))
+    sources = snapshot(source_paths(manifest["jobs"]))
+    print(f"Watching {len(sources)} source files for {len(manifest['jobs'])} jobs (Ctrl+C to stop)")
+
+    while True:
+        time.sleep(interval)
+        current_config = snapshot(config)
+        current = snapshot(sources)
+        if current_config == config and current == sources:
+            continue
+
+        # Wait for the writes to settle before acting on them.
+        while True:
+            time.sleep(debounce)
+            settled_config = snapshot(config)
+            settled = snapshot(sources)
+            if settled_config == current_config and settled == current:
+                break
+            current_config, current = settled_config, settled
+
+        if current_config != config:
+            try:
+                manifest = jobs_module.load_manifest(manifest_path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Manifest not reloaded: {e}")
+                config = current_config
+                continue
+            print("Manifest changed; rerunning jobs that are out of date")
+            batch = manifest["jobs"]
+        else:
+            changed = [path for path, state in current.items() if state != sources[path]]
+            for path in changed:
+                print(f"Changed: {path}")
+            batch = affected_jobs(manifest["jobs"], changed)
+
+        config = snapshot(_config_files(manifest_path, manifest))
+        sources = snapshot(source_paths(manifest["jobs"]))
+        runnable = [job for job in batch if sources.get(job["input"], True) is not None]
+        if runnable:
+            run_batch(manifest, runnable)
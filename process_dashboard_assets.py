@@ -1,6 +1,8 @@
 from PIL import Image
 import os
 
+from asset_pipeline import background
+
 def remove_background(input_path):
     try:
         if not os.path.exists(input_path):
@@ -8,19 +10,9 @@ def remove_background(input_path):
             return
 
         img = Image.open(input_path)
-        img = img.convert("RGBA")
-        
-        datas = img.getdata()
-        new_data = []
         
         # Simple threshold for white/near-white background removal
-        for item in datas:
-            if item[0] > 200 and item[1] > 200 and item[2] > 200:
-                new_data.append((255, 255, 255, 0))
-            else:
-                new_data.append(item)
-                
-        img.putdata(new_data)
+        img = background.remove_white_background(img, 200)
         
         # Save as transparent PNG
         output_path = input_path.replace(".png", "-transparent.png")
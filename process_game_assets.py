@@ -1,23 +1,18 @@
-from PIL import Image, ImageDraw, ImageOps
+from PIL import Image
 import os
 
+from asset_pipeline import transform
+
 def make_circular(input_path):
     try:
         if not os.path.exists(input_path):
             print(f"File not found: {input_path}")
             return
 
-        img = Image.open(input_path).convert("RGBA")
-        
-        # Create circular mask
-        size = min(img.size)
-        mask = Image.new('L', (size, size), 0)
-        draw = ImageDraw.Draw(mask)
-        draw.ellipse((0, 0, size, size), fill=255)
+        img = Image.open(input_path)
         
-        # Crop to square and apply mask
-        output = ImageOps.fit(img, (size, size), centering=(0.5, 0.5))
-        output.putalpha(mask)
+        # Crop to a centred square and apply an anti-aliased circular mask
+        output = transform.make_circular(img)
         
         # Save
         output_path = input_path.replace(".png", "-circle.png")
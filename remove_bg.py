@@ -1,19 +1,11 @@
 from PIL import Image
 
+from asset_pipeline import background
+
 def remove_white_bg(input_path, output_path):
     img = Image.open(input_path)
-    img = img.convert("RGBA")
-    datas = img.getdata()
-
-    newData = []
-    for item in datas:
-        # Change all white (also shades of whites) pixels to transparent
-        if item[0] > 240 and item[1] > 240 and item[2] > 240:
-            newData.append((255, 255, 255, 0))
-        else:
-            newData.append(item)
-
-    img.putdata(newData)
+    # Change all white (also shades of whites) pixels to transparent
+    img = background.remove_white_background(img, 240)
     img.save(output_path, "PNG")
 
 if __name__ == "__main__":
@@ -1,20 +1,12 @@
 from PIL import Image
 import os
 
+from asset_pipeline import background
+
 def remove_white_background(input_path, output_path, tolerance=30):
     try:
-        img = Image.open(input_path).convert("RGBA")
-        datas = img.getdata()
-
-        newData = []
-        for item in datas:
-            # Check if the pixel is close to white
-            if item[0] > 255 - tolerance and item[1] > 255 - tolerance and item[2] > 255 - tolerance:
-                newData.append((255, 255, 255, 0))  # Transparent
-            else:
-                newData.append(item)
-
-        img.putdata(newData)
+        img = Image.open(input_path)
+        img = background.remove_white_background(img, background.tolerance_to_threshold(tolerance))
         img.save(output_path, "PNG")
         print(f"Successfully processed {input_path} to {output_path}")
     except Exception as e:
@@ -1,23 +1,19 @@
 from PIL import Image
 import numpy as np
 
+from asset_pipeline import background
+
 # Load the image
 image_path = "/home/ubuntu/analysis-platform/client/public/images/wooden-bookshelf-isolated.jpg"
 output_path = "/home/ubuntu/analysis-platform/client/public/images/wooden-bookshelf-transparent.png"
 
 try:
-    img = Image.open(image_path).convert("RGBA")
-    datas = img.getdata()
+    pixels = np.array(Image.open(image_path).convert("RGBA"))
 
-    newData = []
-    for item in datas:
-        # Change all white (also shades of whites) pixels to transparent
-        if item[0] > 240 and item[1] > 240 and item[2] > 240:
-            newData.append((255, 255, 255, 0))
-        else:
-            newData.append(item)
+    # Change all white (also shades of whites) pixels to transparent
+    background.clear_white_pixels(pixels, 240)
 
-    img.putdata(newData)
+    img = Image.fromarray(pixels)
     img.save(output_path, "PNG")
     print(f"Successfully saved transparent image to {output_path}")
 
@@ -1,20 +1,12 @@
 from PIL import Image
 import os
 
+from asset_pipeline import background
+
 def remove_white_background(input_path, output_path, threshold=240):
     try:
-        img = Image.open(input_path).convert("RGBA")
-        datas = img.getdata()
-
-        newData = []
-        for item in datas:
-            # Check if the pixel is close to white
-            if item[0] > threshold and item[1] > threshold and item[2] > threshold:
-                newData.append((255, 255, 255, 0))  # Make it transparent
-            else:
-                newData.append(item)
-
-        img.putdata(newData)
+        img = Image.open(input_path)
+        img = background.remove_white_background(img, threshold)
         img.save(output_path, "PNG")
         print(f"Successfully processed {input_path} to {output_path}")
     except Exception as e:
@@ -0,0 +1,47 @@
+import json
+
+from PIL import Image
+
+from asset_pipeline import audit, jobs
+
+
+def _write_tree(tmp_path):
+    public = tmp_path / "public"
+    (public / "images" / "variants").mkdir(parents=True)
+    src = tmp_path / "src"
+    src.mkdir()
+    for name, colour in (("source.png", "red"), ("used.png", "green"), ("stale.png", "blue")):
+        Image.new("RGB", (32, 32), colour).save(public / "images" / name)
+    for name, colour in (("used-16.webp", "green"), ("stale-16.webp", "blue")):
+        Image.new("RGB", (16, 16), colour).save(public / "images" / "variants" / name)
+    (src / "App.tsx").write_text('<img src="/images/used.png" />\n', encoding="utf-8")
+    (public / "asset-manifest.json").write_text(json.dumps({
+        "images/used.png": {"variants": [{"path": "images/variants/used-16.webp"}]},
+        "images/stale.png": {"variants": [{"path": "images/variants/stale-16.webp"}]},
+    }), encoding="utf-8")
+    (tmp_path / "pipeline.json").write_text(json.dumps({
+        "root": "public",
+        "asset_manifest": "asset-manifest.json",
+        "audit": {"sources": ["../src"]},
+        "jobs": [
+            {"op": "remove-bg", "input": "images/source.png", "output": "images/used.png"},
+            {"op": "remove-bg", "input": "images/source.png", "output": "images/stale.png"},
+        ],
+    }), encoding="utf-8")
+    return jobs.load_manifest(str(tmp_path / "pipeline.json"))
+
+
+def test_unreferenced_job_outputs_and_their_variants_are_reported(tmp_path):
+    manifest = _write_tree(tmp_path)
+    records = audit.scan(manifest["audit"], manifest["root"],
+                         [job["input"] for job in manifest["jobs"]], audit.derived_paths(manifest))
+    referenced = {r["path"]: r["referenced"] for r in records}
+    assert referenced == {
+        "images/source.png": False,
+        "images/stale.png": False,
+        "images/used.png": True,
+        "images/variants/stale-16.webp": False,
+        "images/variants/used-16.webp": True,
+    }
+    ranked = {r["path"] for r in audit.savings(records, manifest["audit"], manifest["root"])}
+    assert "images/stale.png" in ranked
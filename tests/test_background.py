@@ -0,0 +1,72 @@
+import os
+import time
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+from asset_pipeline import background, benchmark
+
+IMAGES = os.path.join(os.path.dirname(__file__), "..", "client", "public", "images")
+
+
+def test_auto_threshold_keeps_light_foreground_of_real_icons():
+    # The hand-tuned threshold for these is 225; a cut near the bottom of
+    # AUTO_THRESHOLD_RANGE would clear the icons' light tones too.
+    for name in ("icon-expert.png", "icon-tree.png"):
+        with Image.open(os.path.join(IMAGES, name)) as img:
+            assert 220 <= background.auto_threshold(img) <= 240, name
+
+
+def test_auto_threshold_separates_synthetic_icon():
+    img = benchmark.make_source("icon", (512, 512))
+    threshold = background.auto_threshold(img)
+    pixels = background.remove_white_background(img, threshold)
+    # The object is a noisy dark brown on pure white, so anything between works.
+    assert 190 <= threshold < 255
+    assert pixels.getpixel((0, 0))[3] == 0
+    assert pixels.getpixel((256, 256))[3] == 255
+
+
+def test_auto_threshold_falls_back_without_white_background():
+    assert background.auto_threshold(Image.new("RGB", (64, 64), (30, 30, 30))) == background.DEFAULT_THRESHOLD
+
+
+def _percolating_paper(size, seed=0):
+    # Near the 4-connected percolation threshold, the white regions are long
+    # and winding: the worst case for label propagation.
+    white = np.random.default_rng(seed).random(size) < 0.6
+    pixels = np.where(white[..., None], 250, 100).astype(np.uint8).repeat(4, axis=2)
+    pixels[..., 3] = 255
+    return pixels
+
+
+def _flood_from_border(white):
+    height, width = white.shape
+    seen = np.zeros_like(white)
+    queue = deque((y, x) for y in range(height) for x in range(width)
+                  if white[y, x] and (y in (0, height - 1) or x in (0, width - 1)))
+    for y, x in queue:
+        seen[y, x] = True
+    while queue:
+        y, x = queue.popleft()
+        for ny, nx in ((y - 1, x), (y + 1, x), (y, x - 1), (y, x + 1)):
+            if 0 <= ny < height and 0 <= nx < width and white[ny, nx] and not seen[ny, nx]:
+                seen[ny, nx] = True
+                queue.append((ny, nx))
+    return seen
+
+
+def test_border_background_mask_matches_flood_fill():
+    for seed in range(3):
+        pixels = _percolating_paper((97, 131), seed)
+        expected = _flood_from_border(background.white_mask(pixels, 240))
+        assert np.array_equal(background.border_background_mask(pixels, 240), expected)
+
+
+def test_border_background_mask_is_fast_on_noisy_paper():
+    # Propagating labels one link per pass took about 10 s here.
+    pixels = _percolating_paper((1080, 1920))
+    start = time.perf_counter()
+    background.border_background_mask(pixels, 240)
+    assert time.perf_counter() - start < 3
@@ -0,0 +1,22 @@
+import os
+import re
+
+import pytest
+
+from asset_pipeline import fontsubset
+
+pytest.importorskip("fontTools")
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_font_face_css_only_claims_characters_the_font_has():
+    with open(os.path.join(REPO_ROOT, fontsubset.FONT_FACE_CSS), encoding="utf-8") as f:
+        ranges = re.search(r"unicode-range: ([^;]*);", f.read()).group(1)
+    claimed = set()
+    for entry in ranges.split(", "):
+        start, _, end = entry[2:].partition("-")
+        claimed.update(chr(cp) for cp in range(int(start, 16), int(end or start, 16) + 1))
+    available = fontsubset.font_characters(os.path.join(REPO_ROOT, fontsubset.SUBSET_TTF))
+    assert "✅" not in claimed
+    assert claimed <= available
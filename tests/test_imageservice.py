@@ -0,0 +1,42 @@
+import http.client
+import threading
+from http import HTTPStatus
+
+import pytest
+from PIL import Image
+
+from asset_pipeline import imageservice
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "images").mkdir()
+    Image.new("RGB", (64, 64), "red").save(tmp_path / "images" / "red.png")
+    server = imageservice.make_server(tmp_path, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(server, path):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        connection.request("GET", path)
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def test_resolve_path_rejects_null_bytes(tmp_path):
+    (tmp_path / "images").mkdir()
+    with pytest.raises(imageservice.RequestError):
+        imageservice.resolve_path(str(tmp_path), "/images/x.png%00.png")
+
+
+def test_bad_requests_get_a_status(server, monkeypatch):
+    assert _get(server, "/images/red.png?w=10") == HTTPStatus.OK
+    assert _get(server, "/images/red.png%00.png?w=10") == HTTPStatus.NOT_FOUND
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    assert _get(server, "/images/red.png?w=20") == HTTPStatus.INTERNAL_SERVER_ERROR
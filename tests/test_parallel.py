@@ -0,0 +1,76 @@
+"""The banded operations must match Pillow's byte for byte.
+
+parallel.resize and tiled.zoom_out_file mirror Pillow internals (its
+filter supports, the reduce box of Image._get_safe_box, the Lanczos
+weights of Resample.c), so these pin them against a Pillow upgrade.
+"""
+import numpy as np
+import pytest
+from PIL import Image
+
+from asset_pipeline import background, parallel, tiled, transform
+
+THREADS = (1, 2, 3, 7)
+FILTERS = (Image.Resampling.BOX, Image.Resampling.BILINEAR, Image.Resampling.HAMMING,
+           Image.Resampling.BICUBIC, Image.Resampling.LANCZOS)
+
+
+def _noise(size, mode, seed=0):
+    channels = len(Image.new(mode, (1, 1)).getbands())
+    pixels = np.random.default_rng(seed).integers(0, 256, (size[1], size[0], channels), dtype=np.uint8)
+    return Image.fromarray(pixels[..., 0] if channels == 1 else pixels, mode)
+
+
+def _same(a, b):
+    return a.mode == b.mode and a.size == b.size and a.tobytes() == b.tobytes()
+
+
+@pytest.mark.parametrize("threads", THREADS)
+@pytest.mark.parametrize("resample", FILTERS)
+@pytest.mark.parametrize("mode", ["L", "RGB", "RGBA"])
+def test_resize_matches_pillow(mode, resample, threads):
+    img = _noise((333, 217), mode)
+    for size in [(101, 67), (333, 100), (50, 217), (500, 311), (1, 3)]:
+        for reducing_gap in (None, 2.0, 3.0):
+            expected = img.resize(size, resample, reducing_gap=reducing_gap)
+            actual = parallel.resize(img, size, resample, reducing_gap=reducing_gap, threads=threads)
+            assert _same(actual, expected), (size, reducing_gap)
+
+
+@pytest.mark.parametrize("threads", THREADS)
+def test_resize_with_box_matches_pillow(threads):
+    img = _noise((401, 263), "RGB", seed=1)
+    for box in [(10.5, 3.25, 390.0, 250.75), (0, 0, 200, 263), (37, 41, 338, 199)]:
+        for reducing_gap in (None, 2.5):
+            expected = img.resize((123, 77), Image.Resampling.LANCZOS, box, reducing_gap)
+            actual = parallel.resize(img, (123, 77), Image.Resampling.LANCZOS, box, reducing_gap, threads)
+            assert _same(actual, expected), (box, reducing_gap)
+
+
+@pytest.mark.parametrize("threads", THREADS)
+def test_convert_and_remove_background_match_single_threaded(threads):
+    img = _noise((257, 131), "RGB", seed=2)
+    assert _same(parallel.convert(img, "RGBA", threads), img.convert("RGBA"))
+    assert _same(background.remove_white_background(img, 128, threads), background.remove_white_background(img, 128))
+
+
+@pytest.mark.parametrize("threads", THREADS)
+def test_zoom_out_matches_single_threaded(threads):
+    img = _noise((641, 389), "RGB", seed=3)
+    for scale in (0.65, 0.5, 0.31):
+        assert _same(transform.zoom_out(img, scale, threads=threads), transform.zoom_out(img, scale))
+
+
+@pytest.mark.parametrize("tile_rows", [1, 17, 64, 1000])
+def test_tiled_zoom_out_matches_in_memory(tmp_path, tile_rows):
+    img = _noise((333, 251), "RGB", seed=4)
+    source, output = tmp_path / "source.png", tmp_path / "output.png"
+    img.save(source)
+    tiled.zoom_out_file(str(source), str(output), 0.65, (248, 248, 248), tile_rows)
+    with Image.open(output) as written:
+        assert _same(written.convert("RGB"), transform.zoom_out(img, 0.65, (248, 248, 248)))
+
+
+def test_make_circular_matches_single_threaded():
+    img = _noise((301, 199), "RGBA", seed=5)
+    assert _same(transform.make_circular(img, threads=3), transform.make_circular(img))
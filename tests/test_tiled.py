@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from asset_pipeline import background, benchmark, tiled, transform
+
+
+def _same(a, b):
+    return a.mode == b.mode and a.size == b.size and a.tobytes() == b.tobytes()
+
+
+def _sources(tmp_path):
+    icon = benchmark.make_source("icon", (203, 157))
+    rgba = icon.convert("RGBA")
+    rgba.putalpha(Image.linear_gradient("L").resize(icon.size))
+    palette = icon.quantize(64)
+    palette.info["transparency"] = 3
+    sources = {
+        "rgb.png": icon,
+        "rgba.png": rgba,
+        "l.png": icon.convert("L"),
+        "la.png": rgba.convert("LA"),
+        "p.png": palette,
+        "i16.png": icon.convert("I;16"),
+        "photo.jpg": icon,
+    }
+    for name, img in sources.items():
+        img.save(tmp_path / name, optimize=name == "rgb.png")
+    return [str(tmp_path / name) for name in sources]
+
+
+@pytest.mark.parametrize("tile_rows", [1, 16, 1000])
+def test_source_bands_match_whole_decode(tmp_path, tile_rows):
+    for path in _sources(tmp_path):
+        with Image.open(path) as img:
+            img.load()
+        for y0, band in tiled.source_bands(path, tile_rows):
+            assert _same(band, img.crop((0, y0, img.width, y0 + band.height))), (path, y0)
+
+
+def test_strip_reader_reads_its_own_strips(tmp_path):
+    pixels = np.random.default_rng(0).integers(0, 256, (75, 41, 4), dtype=np.uint8)
+    path = str(tmp_path / "strips.png")
+    with tiled.PngStripWriter(path, 41, 75, "RGBA") as writer:
+        for y0 in range(0, 75, 8):
+            writer.write(pixels[y0:y0 + 8])
+    with tiled.PngStripReader(path) as reader:
+        assert np.array_equal(np.concatenate([np.asarray(band) for _, band in reader.bands(10)]), pixels)
+
+
+def test_strip_reader_rejects_other_files(tmp_path):
+    for path in _sources(tmp_path):
+        if path.endswith(("i16.png", ".jpg")):
+            with pytest.raises(ValueError):
+                tiled.PngStripReader(path)
+
+
+@pytest.mark.parametrize("tile_rows", [7, 1000])
+def test_tiled_remove_bg_matches_in_memory(tmp_path, tile_rows):
+    for path in _sources(tmp_path):
+        output = str(tmp_path / "output.png")
+        box, size, threshold = tiled.remove_white_background_file(
+            path, output, background.AUTO_THRESHOLD, crop=True, padding=3, tile_rows=tile_rows)
+        with Image.open(path) as img:
+            img.load()
+        assert threshold == background.auto_threshold(img), path
+        expected = background.remove_white_background(img, threshold)
+        assert box == transform.content_box(expected, 3) and size == img.size, path
+        with Image.open(output) as written:
+            assert _same(written, expected.crop(box)), path
+
+
+def test_tiled_zoom_out_converts_each_band(tmp_path):
+    for path in _sources(tmp_path):
+        output = str(tmp_path / "output.png")
+        tiled.zoom_out_file(path, output, 0.65, (248, 248, 248), tile_rows=13)
+        with Image.open(path) as img:
+            img.load()
+        with Image.open(output) as written:
+            assert _same(written, transform.zoom_out(img, 0.65, (248, 248, 248))), path
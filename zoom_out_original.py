@@ -1,4 +1,6 @@
-from PIL import Image, ImageOps
+from PIL import Image
+
+from asset_pipeline import jpegenc, transform
 
 def zoom_out_image(input_path, output_path, padding_factor=0.5):
     """
@@ -7,36 +9,12 @@ def zoom_out_image(input_path, output_path, padding_factor=0.5):
     Actually, we'll add padding to make the original image look smaller.
     """
     try:
-        img = Image.open(input_path).convert("RGB")
-        
-        # Calculate new size
-        # If we want the bookshelf to be smaller, we increase the canvas size.
-        # Let's say we want the bookshelf to be 60% of the height.
-        # Current height = h. New height = h / 0.6
-        
-        scale_ratio = 0.65 # The original image will occupy 65% of the new height
-        
-        new_width = int(img.width / scale_ratio)
-        new_height = int(img.height / scale_ratio)
-        
-        # Create new white background
-        new_img = Image.new("RGB", (new_width, new_height), (248, 248, 248)) # Slightly off-white to match paper
-        
-        # Paste original image in center
-        x_offset = (new_width - img.width) // 2
-        y_offset = (new_height - img.height) // 2
-        
-        new_img.paste(img, (x_offset, y_offset))
-        
-        # Resize back to original dimensions (optional, but good for consistency if we want 1920x1080)
-        # Or keep it high res. Let's resize to a standard 1920x1080 ratio if possible, 
-        # but here we just want to keep the aspect ratio reasonable.
-        # Let's resize it back to the original image's dimensions to fit the screen 
-        # (assuming the original was already screen-sized).
-        
-        final_img = new_img.resize((img.width, img.height), Image.Resampling.LANCZOS)
-        
-        final_img.save(output_path)
+        # The original image will occupy 65% of the height, centred on a
+        # slightly off-white canvas (to match paper) of the original size.
+        img = Image.open(input_path)
+        final_img = transform.zoom_out(img, 0.65, (248, 248, 248))
+
+        jpegenc.save(final_img, output_path, jpegenc.resolve_settings(None))
         print(f"Created zoomed-out image at {output_path}")
         
     except Exception as e: